@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from bitacora import configurar
+from simulador import SimuladorPartidas
+
+# Los tiempos de la línea base se guardan junto a `calibracion_ms`, un bucle fijo medido en la
+# misma ejecución; al comparar se escalan por la razón entre ambas calibraciones, así que la
+# base sirve en otra máquina. Aun así, en CI conviene regenerarla en el propio runner:
+#   python benchmark.py --guardar-base   (sobre la rama principal, y guardar el archivo como artefacto)
+RUTA_BASE = "benchmark_base.json"
+FUNCIONES_MEDIDAS = ("_respuesta_fallback", "obtener_info_ui", "_mostrar_resultado_final")
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def calibrar(repeticiones=7):
+    """Milisegundos (mejor de `repeticiones`) de un bucle fijo de Python puro: cadenas, dicts y ordenación"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        conteo = {}
+        for i in range(20000):
+            clave = f"Jugador {i % 97} dice algo"
+            conteo[clave] = conteo.get(clave, 0) + len(clave.lower().split())
+        sorted(conteo.items(), key=lambda par: par[1])
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def medir_tiempos(partidas, semilla):
+    """Turnos por segundo y latencia p50/p99 por fase a lo largo de `partidas` partidas"""
+    por_fase = {}
+
+    def al_turno(fase, texto, segundos):
+        por_fase.setdefault(str(fase), []).append(segundos)
+
+    turnos = 0
+    total = 0.0
+    for i in range(partidas):
+        resultado = SimuladorPartidas(semilla=semilla + i, al_turno=al_turno, n_jugadores=3 + (semilla + i) % 3).jugar()
+        turnos += resultado["turnos"]
+        total += resultado["segundos"]
+
+    return {
+        "partidas": partidas,
+        "turnos": turnos,
+        "turnos_por_segundo": turnos / total if total else 0.0,
+        "fases": {
+            fase: {
+                "turnos": len(tiempos),
+                "p50_ms": percentil(tiempos, 50) * 1000,
+                "p99_ms": percentil(tiempos, 99) * 1000,
+            }
+            for fase, tiempos in sorted(por_fase.items())
+        }
+    }
+
+
+def medir_asignaciones(partidas, semilla):
+    """Bytes asignados (pico) por llamada a cada función medida, con tracemalloc.
+
+    Las funciones medidas se llaman unas a otras (_respuesta_fallback -> _mostrar_resultado_final).
+    tracemalloc tiene un solo pico, así que cada llamada anidada guarda el pico que llevaba la
+    de fuera antes de reiniciarlo y se lo devuelve al salir.
+    """
+    medidas = {nombre: [] for nombre in FUNCIONES_MEDIDAS}
+    pila = []  # [antes, pico] de cada llamada medida en curso, de fuera hacia dentro
+
+    def envolver(asistente, nombre):
+        original = getattr(asistente, nombre)
+
+        def medida(*args, **kwargs):
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1][1] = max(pila[-1][1], pico)
+            tracemalloc.reset_peak()
+            pila.append([actual, actual])
+            try:
+                return original(*args, **kwargs)
+            finally:
+                _, pico = tracemalloc.get_traced_memory()
+                antes, pico_previo = pila.pop()
+                pico = max(pico, pico_previo)
+                medidas[nombre].append(max(0, pico - antes))
+                if pila:
+                    pila[-1][1] = max(pila[-1][1], pico)
+        setattr(asistente, nombre, medida)
+
+    tracemalloc.start()
+    try:
+        for i in range(partidas):
+            simulador = SimuladorPartidas(semilla=semilla + i, n_jugadores=3 + (semilla + i) % 3)
+            asistente = simulador.crear_asistente()
+            for nombre in FUNCIONES_MEDIDAS:
+                envolver(asistente, nombre)
+            # La interfaz consulta el estado después de cada turno
+            simulador.al_turno = lambda fase, texto, segundos, a=asistente: a.obtener_info_ui()
+            try:
+                simulador.jugar(asistente)
+            finally:
+                asistente.cerrar()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        nombre: {
+            "llamadas": len(valores),
+            "bytes_medio": statistics.mean(valores) if valores else 0.0,
+            "bytes_max": max(valores) if valores else 0,
+        }
+        for nombre, valores in medidas.items()
+    }
+
+
+def comparar(actual, base, tolerancia):
+    """Lista de regresiones de `actual` frente a `base` (más lento o más memoria que base * (1 + tolerancia)).
+
+    Los tiempos de la base se llevan a esta máquina con la razón entre calibraciones.
+    """
+    regresiones = []
+    escala = 1.0
+    if base.get("calibracion_ms") and actual.get("calibracion_ms"):
+        escala = actual["calibracion_ms"] / base["calibracion_ms"]
+    minimo_tps = base["turnos_por_segundo"] / escala * (1 - tolerancia)
+    if actual["turnos_por_segundo"] < minimo_tps:
+        regresiones.append(f"turnos/s: {actual['turnos_por_segundo']:.0f} < {minimo_tps:.0f}")
+
+    for fase, medida in actual["fases"].items():
+        referencia = base["fases"].get(fase)
+        if not referencia:
+            continue
+        for clave in ("p50_ms", "p99_ms"):
+            # Margen absoluto de 0.05 ms para no alarmarse por ruido en turnos de microsegundos
+            limite = (referencia[clave] * (1 + tolerancia) + 0.05) * escala
+            if medida[clave] > limite:
+                regresiones.append(f"{fase} {clave}: {medida[clave]:.3f} > {limite:.3f}")
+
+    for nombre, medida in actual["asignaciones"].items():
+        referencia = base["asignaciones"].get(nombre)
+        if referencia and medida["bytes_medio"] > referencia["bytes_medio"] * (1 + tolerancia) + 256:
+            regresiones.append(f"{nombre} bytes/llamada: {medida['bytes_medio']:.0f} > {referencia['bytes_medio']:.0f}")
+    return regresiones
+
+
+def imprimir(resultado):
+    print(f"\nPartidas: {resultado['partidas']}  Turnos: {resultado['turnos']}  "
+          f"Turnos/s: {resultado['turnos_por_segundo']:.0f}  Calibración: {resultado['calibracion_ms']:.2f} ms")
+    print(f"{'fase':<20}{'turnos':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for fase, medida in resultado["fases"].items():
+        print(f"{fase:<20}{medida['turnos']:>8}{medida['p50_ms']:>10.3f}{medida['p99_ms']:>10.3f}")
+    print(f"\n{'función':<28}{'llamadas':>10}{'bytes/llamada':>15}{'máx':>10}")
+    for nombre, medida in resultado["asignaciones"].items():
+        print(f"{nombre:<28}{medida['llamadas']:>10}{medida['bytes_medio']:>15.0f}{medida['bytes_max']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del motor de El Impostor con partidas simuladas")
+    parser.add_argument("--partidas", type=int, default=200)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--base", default=RUTA_BASE, help="archivo con la línea base")
+    parser.add_argument("--guardar-base", action="store_true", help="guarda este resultado como nueva línea base")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # Solo avisos durante la medición: el registro de cada turno no es parte del motor
+    configurar("WARNING")
+    calibracion = calibrar()
+    resultado = medir_tiempos(args.partidas, args.semilla)
+    # Antes y después: si la máquina cambió de ritmo a mitad, se queda la más rápida
+    resultado["calibracion_ms"] = min(calibracion, calibrar())
+    resultado["asignaciones"] = medir_asignaciones(max(1, args.partidas // 10), args.semilla)
+    resultado["fecha"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    imprimir(resultado)
+
+    if args.guardar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"\nLínea base guardada en {args.base}")
+        return 0
+
+    if not os.path.exists(args.base):
+        print(f"\nSin línea base ({args.base}); usa --guardar-base para crearla")
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    regresiones = comparar(resultado, base, args.tolerancia)
+    if regresiones:
+        print("\nREGRESIONES:")
+        for r in regresiones:
+            print(f"  {r}")
+        return 1
+    print("\nSin regresiones frente a la línea base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+# Bitácora del juego sobre logging de la biblioteca estándar.
+#   log = registro("motor"); log.info("Entrada: %r", texto)   # se formatea solo si se va a mostrar
+# Importar los módulos del juego no instala nada: solo los puntos de entrada (interfaz, servidor,
+# benchmark, simulador, consola de prueba) llaman a configurar(). Entonces los hilos de audio y
+# de Tk solo encolan el registro y un hilo aparte escribe en la consola.
+# Configuración por variables de entorno:
+#   IMPOSTOR_LOG=INFO                                 nivel general (DEBUG, INFO, WARNING...)
+#   IMPOSTOR_LOG_COMPONENTES=motor=DEBUG,vosk=WARNING  nivel por componente (OFF lo silencia)
+# El componente "secreto" (palabra e impostor) está apagado salvo que se pida explícitamente.
+
+RAIZ = "impostor"
+COMPONENTES_APAGADOS = {"secreto"}
+NIVEL_APAGADO = logging.CRITICAL + 1
+
+# Como biblioteca no escribe nada hasta que la aplicación configure el registro
+logging.getLogger(RAIZ).addHandler(logging.NullHandler())
+
+_configurado = False
+_lock = threading.Lock()
+
+
+def _nivel(valor, invalidos):
+    """Nivel numérico para "DEBUG", "10", "OFF"...; los nombres desconocidos se anotan y quedan en INFO"""
+    if isinstance(valor, int):
+        return valor
+    texto = str(valor).strip().upper()
+    if texto == "OFF":
+        return NIVEL_APAGADO
+    if texto.isdigit():
+        return int(texto)
+    nivel = logging.getLevelNamesMapping().get(texto)
+    if nivel is None:
+        invalidos.append(valor)
+        return logging.INFO
+    return nivel
+
+
+def configurar(nivel=None, componentes=None, destino=None):
+    """Fija los niveles (por defecto desde el entorno) e instala la primera vez el manejador con cola"""
+    global _configurado
+    invalidos = []
+    with _lock:
+        nivel = nivel or os.environ.get("IMPOSTOR_LOG", "INFO")
+        if componentes is None:
+            componentes = {}
+            for par in os.environ.get("IMPOSTOR_LOG_COMPONENTES", "").split(","):
+                if "=" in par:
+                    nombre, valor = par.split("=", 1)
+                    componentes[nombre.strip()] = valor
+
+        raiz = logging.getLogger(RAIZ)
+        raiz.setLevel(_nivel(nivel, invalidos))
+        for nombre in COMPONENTES_APAGADOS:
+            if nombre not in componentes:
+                logging.getLogger(f"{RAIZ}.{nombre}").setLevel(NIVEL_APAGADO)
+        for nombre, valor in componentes.items():
+            logging.getLogger(f"{RAIZ}.{nombre}").setLevel(_nivel(valor, invalidos))
+
+        if not _configurado:
+            _configurado = True
+            _instalar(raiz, destino or sys.stderr)
+
+    if invalidos:
+        registro("bitacora").warning("Niveles de registro desconocidos %s; se usa INFO", invalidos)
+
+
+def _instalar(raiz, destino):
+    raiz.propagate = False
+    consola = logging.StreamHandler(destino)
+    consola.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(name)s] %(message)s", "%H:%M:%S"))
+
+    cola = queue.SimpleQueue()
+    manejador_cola = logging.handlers.QueueHandler(cola)
+    raiz.addHandler(manejador_cola)
+    oyente = logging.handlers.QueueListener(cola, consola, respect_handler_level=True)
+    oyente.start()
+
+    def al_salir():
+        # Vacía la cola; lo que se registre después (otros atexit) va directo a la consola
+        oyente.stop()
+        raiz.removeHandler(manejador_cola)
+        raiz.addHandler(consola)
+    atexit.register(al_salir)
+
+
+def registro(componente):
+    """Logger del componente (motor, vosk, audio, ui, servidor...). No configura nada"""
+    return logging.getLogger(f"{RAIZ}.{componente}")
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+
+class BucleAsync:
+    """Un único event loop asyncio, en un hilo dedicado, para la E/S de red de todo el proceso.
+
+    Tk y los hilos de trabajo le envían corrutinas con `enviar` (devuelve un
+    concurrent.futures.Future) o `ejecutar` (bloquea hasta el resultado).
+    """
+
+    _compartido = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def compartido(cls):
+        """Devuelve el bucle del proceso, arrancándolo la primera vez"""
+        with cls._lock:
+            if cls._compartido is None or not cls._compartido.activo:
+                cls._compartido = cls()
+            return cls._compartido
+
+    def __init__(self, nombre="bucle-async"):
+        self.loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._correr, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def _correr(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def activo(self):
+        return self._hilo.is_alive() and not self.loop.is_closed()
+
+    def en_hilo_del_bucle(self):
+        return threading.current_thread() is self._hilo
+
+    def enviar(self, corrutina):
+        """Programa la corrutina en el bucle desde cualquier hilo"""
+        return asyncio.run_coroutine_threadsafe(corrutina, self.loop)
+
+    def ejecutar(self, corrutina, timeout=None):
+        """Ejecuta la corrutina y espera su resultado (no llamar desde el propio bucle)"""
+        if self.en_hilo_del_bucle():
+            corrutina.close()
+            raise RuntimeError("ejecutar() bloquearía el propio event loop; usa await")
+        return self.enviar(corrutina).result(timeout)
+
+    def detener(self):
+        if not self.activo:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._hilo.join(timeout=2.0)
+        self.loop.close()
@@ -0,0 +1,140 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from bitacora import registro
+from intenciones import plegar
+
+log = registro("cache_respuestas")
+
+
+class CacheRespuestas:
+    """Respuestas de Gemini ya dadas, por (fase, texto normalizado, nº de jugadores).
+
+    Expira por TTL, expulsa lo menos usado al llenarse y se guarda en un JSON para
+    sobrevivir entre ejecuciones (ruta=None: solo en memoria). La escritura no ocurre en el
+    turno: se agrupa `retraso_guardado` segundos en un hilo aparte y se completa en `cerrar()`
+    o al salir. Solo debe recibir respuestas que no cambian el estado.
+    """
+
+    _compartidos = {}
+    _lock_compartidos = threading.Lock()
+
+    @classmethod
+    def compartido(cls, ruta="cache_respuestas.json", **kwargs):
+        """Una sola instancia por archivo en todo el proceso"""
+        clave = os.path.abspath(ruta)
+        with cls._lock_compartidos:
+            if clave not in cls._compartidos:
+                cls._compartidos[clave] = cls(ruta, **kwargs)
+            return cls._compartidos[clave]
+
+    def __init__(self, ruta="cache_respuestas.json", max_entradas=256, ttl=7 * 24 * 3600, retraso_guardado=5.0):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.retraso_guardado = retraso_guardado
+        self._entradas = OrderedDict()  # clave -> (respuesta, expira_en)
+        self._lock = threading.Lock()
+        self._lock_disco = threading.Lock()
+        self._temporizador = None  # escritura pendiente
+        self.aciertos = 0
+        self.fallos = 0
+        self._cargar()
+        if self.ruta is not None:
+            atexit.register(self.cerrar)
+
+    @staticmethod
+    def clave(fase, texto, n_jugadores):
+        # Sin tildes ni puntuación y con espacios simples: 'Hola!' y 'hola' son la misma entrada
+        return f"{fase}|{n_jugadores}|{' '.join(re.findall(r'[a-z0-9]+', plegar(texto)))}"
+
+    def _cargar(self):
+        if self.ruta is None:
+            return
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                datos = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning("No se pudo leer %s: %s", self.ruta, e)
+            return
+
+        ahora = time.time()
+        for clave, respuesta, expira in datos.get("entradas", []):
+            if expira > ahora:
+                self._entradas[clave] = (respuesta, expira)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def _programar_guardado(self):
+        """Agenda una escritura si no hay ya una pendiente. Llamar con self._lock tomado"""
+        if self.ruta is None or self._temporizador is not None:
+            return
+        self._temporizador = threading.Timer(self.retraso_guardado, self._guardar_disco)
+        self._temporizador.daemon = True
+        self._temporizador.start()
+
+    def _guardar_disco(self):
+        with self._lock:
+            self._temporizador = None
+            entradas = [[clave, respuesta, expira] for clave, (respuesta, expira) in self._entradas.items()]
+        # Escritura atómica: un archivo temporal que reemplaza al anterior
+        temporal = f"{self.ruta}.tmp"
+        with self._lock_disco:
+            try:
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump({"entradas": entradas}, f, ensure_ascii=False)
+                os.replace(temporal, self.ruta)
+            except OSError as e:
+                log.warning("No se pudo escribir %s: %s", self.ruta, e)
+
+    def cerrar(self):
+        """Escribe ya lo que quede pendiente y anota cuánto sirvió el cache"""
+        with self._lock:
+            temporizador = self._temporizador
+            self._temporizador = None
+        if temporizador is not None:
+            temporizador.cancel()
+            self._guardar_disco()
+        estadisticas = self.estadisticas()
+        if estadisticas["aciertos"] or estadisticas["fallos"]:
+            log.info("Aciertos %(aciertos)s, fallos %(fallos)s (%(tasa_aciertos).0f%%), %(entradas)s entradas",
+                     {**estadisticas, "tasa_aciertos": 100 * estadisticas["tasa_aciertos"]})
+
+    def obtener(self, fase, texto, n_jugadores):
+        clave = self.clave(fase, texto, n_jugadores)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[1] <= time.time():
+                if entrada is not None:
+                    del self._entradas[clave]
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, fase, texto, n_jugadores, respuesta):
+        clave = self.clave(fase, texto, n_jugadores)
+        with self._lock:
+            self._entradas[clave] = (respuesta, time.time() + self.ttl)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+            self._programar_guardado()
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "entradas": len(self._entradas),
+                "tasa_aciertos": self.aciertos / total if total else 0.0
+            }
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from bitacora import registro
+
+log = registro("cache_tts")
+
+
+class CacheTTS:
+    """Cache de audio TTS en memoria y en disco, direccionado por (voz, hash del texto).
+
+    Ambos niveles tienen un tamaño máximo en bytes y expulsan lo menos usado (LRU).
+    En disco el orden LRU se reconstruye al arrancar con la fecha de modificación,
+    así que las frases repetidas entre partidas siguen siendo aciertos.
+    """
+
+    def __init__(self, directorio="cache_tts", max_bytes_disco=64 * 1024 * 1024,
+                 max_bytes_memoria=8 * 1024 * 1024, extension=".mp3"):
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self.max_bytes_memoria = max_bytes_memoria
+        self.extension = extension
+        self._memoria = OrderedDict()  # clave -> bytes
+        self._bytes_memoria = 0
+        self._disco = OrderedDict()    # clave -> tamaño en bytes
+        self._bytes_disco = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self._indexar_disco()
+
+    @staticmethod
+    def clave(voz, texto):
+        return hashlib.sha256(f"{voz}\n{texto}".encode("utf-8")).hexdigest()
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, clave + self.extension)
+
+    def _indexar_disco(self):
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            entradas = []
+            for nombre in os.listdir(self.directorio):
+                if nombre.endswith(self.extension):
+                    info = os.stat(os.path.join(self.directorio, nombre))
+                    entradas.append((info.st_mtime, nombre[:-len(self.extension)], info.st_size))
+        except OSError as e:
+            log.warning("No se pudo leer %s: %s", self.directorio, e)
+            return
+
+        for _, clave, tam in sorted(entradas):
+            self._disco[clave] = tam
+            self._bytes_disco += tam
+        self._recortar_disco()
+
+    def obtener(self, voz, texto):
+        """Devuelve los bytes de audio cacheados o None"""
+        clave = self.clave(voz, texto)
+        with self._lock:
+            datos = self._memoria.get(clave)
+            if datos is not None:
+                self._memoria.move_to_end(clave)
+                if clave in self._disco:
+                    self._disco.move_to_end(clave)
+                self.aciertos += 1
+                return datos
+
+            if clave not in self._disco:
+                self.fallos += 1
+                return None
+
+            ruta = self._ruta(clave)
+            try:
+                with open(ruta, "rb") as f:
+                    datos = f.read()
+                os.utime(ruta)
+            except OSError:
+                self._bytes_disco -= self._disco.pop(clave)
+                self.fallos += 1
+                return None
+
+            self._disco.move_to_end(clave)
+            self._guardar_memoria(clave, datos)
+            self.aciertos += 1
+            return datos
+
+    def guardar(self, voz, texto, datos):
+        """Guarda el audio sintetizado en ambos niveles"""
+        if not datos:
+            return
+        clave = self.clave(voz, texto)
+        with self._lock:
+            self._guardar_memoria(clave, datos)
+            if clave in self._disco:
+                self._disco.move_to_end(clave)
+                return
+            ruta = self._ruta(clave)
+            try:
+                # Escritura atómica: otra partida puede estar leyendo la misma clave
+                temporal = f"{ruta}.{threading.get_ident()}.tmp"
+                with open(temporal, "wb") as f:
+                    f.write(datos)
+                os.replace(temporal, ruta)
+            except OSError as e:
+                log.warning("No se pudo escribir %s: %s", ruta, e)
+                return
+            self._disco[clave] = len(datos)
+            self._bytes_disco += len(datos)
+            self._recortar_disco()
+
+    def _guardar_memoria(self, clave, datos):
+        if len(datos) > self.max_bytes_memoria:
+            return
+        anterior = self._memoria.pop(clave, None)
+        if anterior is not None:
+            self._bytes_memoria -= len(anterior)
+        self._memoria[clave] = datos
+        self._bytes_memoria += len(datos)
+        while self._bytes_memoria > self.max_bytes_memoria:
+            _, viejo = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(viejo)
+
+    def _recortar_disco(self):
+        while self._bytes_disco > self.max_bytes_disco and self._disco:
+            clave, tam = self._disco.popitem(last=False)
+            self._bytes_disco -= tam
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                pass
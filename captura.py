@@ -0,0 +1,253 @@
+import os
+from math import gcd
+
+import numpy as np
+
+from bitacora import registro
+
+log = registro("audio")
+
+FRECUENCIA_VOSK_DEFECTO = 16000
+
+
+def frecuencia_modelo(ruta_modelo="model"):
+    """Lee la frecuencia de muestreo del modelo Vosk desde conf/mfcc.conf"""
+    ruta = os.path.join(ruta_modelo, "conf", "mfcc.conf")
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            for linea in f:
+                if linea.startswith("--sample-frequency="):
+                    return int(float(linea.split("=", 1)[1]))
+    except (OSError, ValueError):
+        pass
+    return FRECUENCIA_VOSK_DEFECTO
+
+
+class RemuestreadorPolifase:
+    """Remuestreo racional up/down con filtro FIR polifásico que conserva estado entre bloques.
+
+    Todos los arrays de trabajo se reservan para bloques de hasta `bloque_max` muestras, así
+    que `procesar` no asigna memoria en el callback de audio. Devuelve una vista sobre un
+    buffer interno que se sobrescribe en la siguiente llamada: hay que copiarla antes.
+    """
+
+    def __init__(self, frecuencia_entrada, frecuencia_salida, taps_por_fase=24, bloque_max=4800):
+        divisor = gcd(frecuencia_entrada, frecuencia_salida)
+        self.up = frecuencia_salida // divisor
+        self.down = frecuencia_entrada // divisor
+
+        # Filtro paso bajo (sinc con ventana de Kaiser) a la frecuencia sobremuestreada
+        n_taps = taps_por_fase * self.up
+        corte = 0.9 / max(self.up, self.down)
+        t = np.arange(n_taps) - (n_taps - 1) / 2
+        h = corte * np.sinc(corte * t) * np.kaiser(n_taps, 8.0) * self.up
+
+        # por_tap[k][p] = h[p + k*up]: coeficiente del tap k para la fase p
+        self.taps = taps_por_fase
+        self.por_tap = np.ascontiguousarray(h.reshape(taps_por_fase, self.up).astype(np.float32))
+
+        self.inicio_historial = -(self.taps - 1)  # índice global de x[0]
+        self.total_entrada = 0
+        self.siguiente_m = 0  # índice sobremuestreado de la próxima salida
+        self._reservar(bloque_max)
+
+    def _reservar(self, bloque_max):
+        """Buffers de trabajo para bloques de hasta bloque_max muestras (conserva el historial)"""
+        historial = self.taps - 1
+        anterior = getattr(self, "_x", None)
+        self.bloque_max = bloque_max
+        self._x = np.zeros(historial + bloque_max, dtype=np.float32)
+        if anterior is not None:
+            self._x[:historial] = anterior[:historial]
+        self._cola = np.zeros(historial, dtype=np.float32)
+
+        salidas = bloque_max * self.up // self.down + 2
+        self._k = np.arange(salidas)
+        self._m = np.zeros(salidas, dtype=np.int64)
+        self._fase = np.zeros(salidas, dtype=np.int64)
+        self._j0 = np.zeros(salidas, dtype=np.int64)
+        self._indice = np.zeros(salidas, dtype=np.int64)
+        self._muestra = np.zeros(salidas, dtype=np.float32)
+        self._coef = np.zeros(salidas, dtype=np.float32)
+        self._salida = np.zeros(salidas, dtype=np.float32)
+        self._salida_int16 = np.zeros(salidas, dtype=np.int16)
+
+    def procesar(self, bloque):
+        """Recibe int16 a la frecuencia de entrada y devuelve int16 a la de salida"""
+        n = len(bloque)
+        if n > self.bloque_max:
+            self._reservar(n)  # solo si el dispositivo entrega bloques mayores de lo previsto
+        historial = self.taps - 1
+        x = self._x[:historial + n]
+        x[historial:] = bloque
+        self.total_entrada += n
+
+        m_max = (self.total_entrada - 1) * self.up + self.up - 1
+        cantidad = max(0, (m_max - self.siguiente_m) // self.down + 1)
+
+        # Salida i = sum_k por_tap[k][m_i % up] * x[m_i // up - k], un tap cada vez con
+        # vectores 1D contiguos: las operaciones con out= no crean temporales
+        m = np.multiply(self._k[:cantidad], self.down, out=self._m[:cantidad])
+        m += self.siguiente_m
+        fase = np.remainder(m, self.up, out=self._fase[:cantidad])
+        j0 = np.floor_divide(m, self.up, out=self._j0[:cantidad])
+        j0 -= self.inicio_historial
+        indice = self._indice[:cantidad]
+        muestra = self._muestra[:cantidad]
+        coef = self._coef[:cantidad]
+        salida = self._salida[:cantidad]
+        salida.fill(0.0)
+        for k in range(self.taps):
+            np.subtract(j0, k, out=indice)
+            np.take(x, indice, out=muestra, mode="clip")
+            np.take(self.por_tap[k], fase, out=coef, mode="clip")
+            muestra *= coef
+            salida += muestra
+        np.clip(salida, -32768, 32767, out=salida)
+        self.siguiente_m += self.down * cantidad
+
+        # Las últimas muestras pasan a ser el historial del siguiente bloque
+        self._cola[:] = x[n:]
+        self._x[:historial] = self._cola
+        self.inicio_historial = self.total_entrada - historial
+
+        salida_int16 = self._salida_int16[:cantidad]
+        salida_int16[:] = salida
+        return salida_int16
+
+
+class BufferCircular:
+    """Buffer circular SPSC sin locks sobre un único array NumPy preasignado.
+
+    Productor: el callback de audio (escribir). Consumidor: un único hilo lector
+    (vistas/consumir). Cada lado solo modifica su propio contador, así que basta
+    con el GIL. Si no hay espacio libre o se alcanzó `limite_total`, las muestras
+    nuevas se descartan y se cuentan en `perdidas`.
+    """
+
+    def __init__(self, capacidad, limite_total=None, dtype=np.int16):
+        self.capacidad = capacidad
+        self.limite_total = limite_total  # máximo de muestras aceptadas desde reiniciar()
+        self.datos = np.zeros(capacidad, dtype=dtype)
+        self._escritura = 0  # total escrito, solo lo avanza el productor
+        self._lectura = 0    # total leído, solo lo avanza el consumidor
+        self.perdidas = 0
+
+    def reiniciar(self):
+        """Vacía el buffer. Llamar solo cuando productor y consumidor están detenidos"""
+        self._escritura = 0
+        self._lectura = 0
+        self.perdidas = 0
+
+    @property
+    def total_escrito(self):
+        return self._escritura
+
+    @property
+    def desbordado(self):
+        return self.perdidas > 0
+
+    def disponibles(self):
+        return self._escritura - self._lectura
+
+    def escribir(self, bloque):
+        """Copia el bloque sin asignar memoria. Devuelve cuántas muestras se aceptaron"""
+        n = min(len(bloque), self.capacidad - (self._escritura - self._lectura))
+        if self.limite_total is not None:
+            n = min(n, self.limite_total - self._escritura)
+        n = max(n, 0)
+
+        if n:
+            pos = self._escritura % self.capacidad
+            primera = min(n, self.capacidad - pos)
+            self.datos[pos:pos + primera] = bloque[:primera]
+            if n > primera:
+                self.datos[:n - primera] = bloque[primera:n]
+
+        if n < len(bloque):
+            self.perdidas += len(bloque) - n
+        # Publicar después de copiar para que el lector nunca vea datos a medias
+        self._escritura += n
+        return n
+
+    def vistas(self):
+        """Vistas sin copia de lo pendiente de leer (una o dos si da la vuelta)"""
+        inicio = self._lectura
+        fin = self._escritura
+        if fin == inicio:
+            return ()
+        pos = inicio % self.capacidad
+        n = fin - inicio
+        if pos + n <= self.capacidad:
+            return (self.datos[pos:pos + n],)
+        return (self.datos[pos:], self.datos[:pos + n - self.capacidad])
+
+    def consumir(self, n):
+        """Libera n muestras ya procesadas por el lector"""
+        self._lectura += min(n, self._escritura - self._lectura)
+
+
+class CapturaMicrofono:
+    """Micrófono mono int16 a la frecuencia del reconocedor; remuestrea solo si el dispositivo no la soporta"""
+
+    def __init__(self, frecuencia_objetivo, al_bloque, bloque_ms=100, dispositivo=None):
+        self.frecuencia_objetivo = frecuencia_objetivo
+        self.al_bloque = al_bloque  # callback(np.ndarray int16), llamado desde el hilo de audio
+        self.bloque_ms = bloque_ms
+        self.dispositivo = dispositivo
+        self.frecuencia_dispositivo = None
+        self.remuestreador = None
+        self.stream = None
+
+    def _frecuencia_soportada(self, sd):
+        try:
+            sd.check_input_settings(
+                device=self.dispositivo,
+                channels=1,
+                dtype="int16",
+                samplerate=self.frecuencia_objetivo
+            )
+            return self.frecuencia_objetivo
+        except Exception:
+            info = sd.query_devices(self.dispositivo, "input")
+            return int(info["default_samplerate"])
+
+    def abrir(self):
+        import sounddevice as sd  # PortAudio solo se carga cuando de verdad se abre el micrófono
+        frecuencia = self._frecuencia_soportada(sd)
+        self.frecuencia_dispositivo = frecuencia
+        self.remuestreador = None
+        if frecuencia != self.frecuencia_objetivo:
+            # Estado de filtro nuevo en cada locución
+            self.remuestreador = RemuestreadorPolifase(
+                frecuencia, self.frecuencia_objetivo, bloque_max=int(frecuencia * self.bloque_ms / 1000)
+            )
+            log.info("Dispositivo a %s Hz, remuestreando a %s Hz", frecuencia, self.frecuencia_objetivo)
+
+        self.stream = sd.RawInputStream(
+            device=self.dispositivo,
+            channels=1,
+            samplerate=frecuencia,
+            dtype="int16",
+            blocksize=int(frecuencia * self.bloque_ms / 1000),
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def cerrar(self):
+        if self.stream:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+    def _callback(self, indata, frames, time, status):
+        if status:
+            log.warning("Estado del stream: %s", status)
+        # Vista sin copia sobre el buffer de PortAudio (solo válida dentro del callback)
+        bloque = np.frombuffer(indata, dtype=np.int16)
+        if self.remuestreador:
+            bloque = self.remuestreador.procesar(bloque)
+        self.al_bloque(bloque)
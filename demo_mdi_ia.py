@@ -1,20 +1,57 @@
-import os
 import json
 import random
-import google.generativeai as genai
-from dotenv import load_dotenv
+import re
+from collections import deque
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 import time
+from limitador import segundos_de_reintento
+from cache_respuestas import CacheRespuestas
+from intenciones import MotorIntenciones
+from nombres import IndiceNombres
+from gramaticas import GramaticasFase
+from maquina_estados import Fase, MaquinaEstados, CUALQUIER_FASE
+from estado_ui import EstadoUI, PublicadorEstado
+from trazas import trazador
+from bitacora import registro
 
-load_dotenv()
+log = registro("motor")
+# Palabra secreta e impostor: apagado por defecto (IMPOSTOR_LOG_COMPONENTES=secreto=DEBUG)
+log_secreto = registro("secreto")
 
-api_key_google = os.environ.get("GOOGLE_API_KEY")
-genai.configure(api_key=api_key_google)
+# Respuestas de emergencia (cuota agotada) por fase
+RESPUESTAS_GENERICAS = {
+    Fase.MOSTRANDO_PALABRAS: "[JUGADOR_LISTO] Perfecto, siguiente jugador por favor.",
+    Fase.JUGANDO: "[GUARDAR_PISTA] Entendido. Siguiente jugador.",
+    Fase.PREGUNTA_FINAL: "[RESPUESTA_PREGUNTA] Interesante respuesta. Siguiente pareja.",
+}
+
+# Etiquetas que puede escribir la IA, en orden de prioridad, y el evento que disparan
+COMANDOS_IA = (
+    ("[INICIAR]", "cmd_iniciar"),
+    ("[REGISTRAR:", "cmd_registrar"),
+    ("[INICIAR_JUEGO]", "cmd_iniciar_juego"),
+)
 
 class AsistenteImpostor:
-    def __init__(self):
+    def __init__(self, llm=None, cache_respuestas=None, rng=None):
+        """llm: servicio de servicios.py (por defecto Gemini, cargado al primer uso); LLMNulo para simular sin red.
+        rng: random.Random del que sale todo el azar de la partida (palabra, impostor, turnos, comentarios)"""
+        if llm is None:
+            from servicios import LLMGemini
+            llm = LLMGemini()
+        self.llm = llm
+        self.rng = rng if rng is not None else random.Random()
+        
         self.jugadores = []
         self.generos = {}
-        self.fase = "inicio"
+        # Flujo del juego como tabla de transiciones; self.fase la consulta
+        self.maquina = self._construir_maquina()
+        
+        # Foto del estado para la UI: se reconstruye solo cuando cambia la versión
+        self.version = 0
+        self._estado_ui = None
+        self.publicador_estado = PublicadorEstado()
       
         # Palabras ecuatorianas
         self.palabras_ecuador = [
@@ -100,12 +137,42 @@ class AsistenteImpostor:
         self.pregunta_elegida = None
         self.preguntas_mostradas = []
         
-        # Rate limiting
-        self.ultimo_request_ia = 0
-        self.min_intervalo = 2.0
+        # Rate limiting: cubo del servicio (compartido por todas las partidas con la misma API key)
+        self.limitador = self.llm.limitador
+        
+        # Comentarios de pistas en segundo plano con presupuesto de latencia
+        self.presupuesto_comentario = 1.2  # segundos máximos que el turno espera al comentario
+        self.encolar_comentarios_tardios = False  # True: los tardíos se dicen en el siguiente turno
+        self.comentarios_tardios = deque(maxlen=2)
+        self.comentarios_fallback = [
+            "Interesante perspectiva.",
+            "Hmm, muy revelador.",
+            "Esa pista dice mucho... o tal vez nada.",
+            "Curioso enfoque.",
+            "Veo que piensas diferente.",
+            "Eso nos da mucho en qué pensar."
+        ]
+        self._ejecutor_ia = ThreadPoolExecutor(max_workers=2, thread_name_prefix="comentario-ia")
+        
+        # Respuestas de Gemini que no cambian el estado, reutilizables entre partidas y ejecuciones
+        if cache_respuestas is None:
+            cache_respuestas = CacheRespuestas.compartido("cache_respuestas.json")
+        self.cache_respuestas = cache_respuestas
+        
+        # Patrones de intención compilados una vez; el fallback los consulta en una sola pasada.
+        # El índice de nombres se llena en el registro y resuelve votos mal transcritos.
+        self.indice_nombres = IndiceNombres()
+        self.intenciones = MotorIntenciones(indice_nombres=self.indice_nombres)
+        
+        # Vocabulario que Vosk debe esperar en cada fase (None = abierto)
+        self.gramaticas = GramaticasFase()
         
         self.inicializar_ia()
     
+    @property
+    def fase(self):
+        return self.maquina.fase
+    
     def inicializar_ia(self):
         """IA con personalidad ajustada: Formal, Amable y Neutra"""
         prompt_sistema = """
@@ -133,22 +200,37 @@ REGLAS DE INTERACCIÓN:
 - Usa humor sutil sin ofender.
 """
         
-        self.model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            system_instruction=prompt_sistema
+        # Ventana deslizante por partida: el tamaño de cada petición ya no crece con la noche
+        self.historial_chat = self.llm.crear_chat(prompt_sistema, max_turnos=8)
+        
+        # Comentarios de pistas: modelo ligero, sin historial y con salida corta.
+        # Así no ensucian el chat del moderador ni agrandan sus peticiones.
+        self.generar_comentario_ia = self.llm.crear_generador(
+            "Eres Jarvis, moderador amable y sutilmente cómico del juego 'El Impostor'. Responde en español, en texto plano, sin emojis.",
+            max_tokens=40,
+            temperatura=0.9
         )
-        self.chat = self.model.start_chat(history=[])
     
-    def generar_comentario_pista(self, jugador, pista):
-        """Genera un comentario cómico sobre la pista usando IA"""
+    def generar_comentario_pista(self, jugador, pista, limite=None, generico=None):
+        """Genera un comentario cómico sobre la pista usando IA.
+
+        `limite`: instante (time.monotonic) tras el que ya no sirve. `generico`: comentario de
+        reserva, elegido por quien llama para no tocar self.rng desde el hilo del ejecutor.
+        """
+        if generico is None:
+            generico = self.rng.choice(self.comentarios_fallback)
         try:
             prompt = f"""El jugador {jugador} acaba de dar esta pista sobre la palabra secreta: "{pista}"
 
 Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico sobre lo que dijo. El comentario debe ser amigable y no revelar nada sobre la palabra. Solo responde con el comentario, sin explicaciones adicionales."""
             
-            self._esperar_rate_limit()
-            response = self.chat.send_message(prompt)
-            comentario = response.text.strip()
+            espera_max = None if limite is None else limite - time.monotonic()
+            if (espera_max is not None and espera_max <= 0) or not self.limitador.adquirir(timeout=espera_max):
+                # Sin cupo dentro del presupuesto: no vale la pena esperar por un comentario
+                return generico
+            # Petición única y sin estado: no pasa por self.historial_chat
+            with trazador.span("comentario_ia"):
+                comentario = self.generar_comentario_ia(prompt).strip()
             
             # Limitar longitud por seguridad
             if len(comentario.split()) > 20:
@@ -156,17 +238,30 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
             
             return comentario
         except Exception as e:
-            print(f"[ERROR COMENTARIO IA] {e}")
+            log.warning("Error en comentario IA: %s", e)
+            self._registrar_error_cuota(str(e))
             # Fallback: comentarios genéricos
-            comentarios_fallback = [
-                "Interesante perspectiva.",
-                "Hmm, muy revelador.",
-                "Esa pista dice mucho... o tal vez nada.",
-                "Curioso enfoque.",
-                "Veo que piensas diferente.",
-                "Eso nos da mucho en qué pensar."
-            ]
-            return random.choice(comentarios_fallback)
+            return generico
+    
+    def _lanzar_comentario_pista(self, jugador, pista, limite, generico):
+        """Empieza a generar el comentario en segundo plano; el turno sigue avanzando mientras tanto"""
+        return self._ejecutor_ia.submit(self.generar_comentario_pista, jugador, pista, limite, generico)
+    
+    def _esperar_comentario(self, futuro, limite, generico):
+        """Usa el comentario si llega antes de `limite`; si no, sigue con uno genérico"""
+        restante = limite - time.monotonic()
+        try:
+            return futuro.result(timeout=max(0.0, restante))
+        except FuturesTimeout:
+            log.info("Comentario IA fuera de presupuesto (%ss), usando genérico", self.presupuesto_comentario)
+            if self.encolar_comentarios_tardios:
+                # generar_comentario_pista nunca lanza: siempre hay un texto que encolar
+                futuro.add_done_callback(lambda f: self.comentarios_tardios.append(f.result()))
+            return generico
+    
+    def cerrar(self):
+        """Libera los hilos de comentarios (p. ej. al cerrar una mesa del servidor)"""
+        self._ejecutor_ia.shutdown(wait=False, cancel_futures=True)
     
     def detectar_genero(self, nombre):
         """Detección simple de género sin IA"""
@@ -185,16 +280,20 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
             return "hombre"
     
     def _esperar_rate_limit(self):
-        """Espera si es necesario para respetar rate limit"""
-        tiempo_transcurrido = time.time() - self.ultimo_request_ia
-        if tiempo_transcurrido < self.min_intervalo:
-            time.sleep(self.min_intervalo - tiempo_transcurrido)
-        self.ultimo_request_ia = time.time()
+        """Toma un token del cubo; solo espera si de verdad se está excediendo el cupo"""
+        self.limitador.adquirir()
+    
+    def _registrar_error_cuota(self, error_msg):
+        """Si Gemini respondió 429/cuota, frena el cubo el tiempo que pide el servidor"""
+        if "429" in error_msg or "quota" in error_msg.lower():
+            self.limitador.penalizar(segundos_de_reintento(error_msg))
+            return True
+        return False
     
     def _crear_parejas_dinamica(self):
         """Crea parejas para que todos participen al menos una vez"""
         jugadores_copia = self.jugadores.copy()
-        random.shuffle(jugadores_copia)
+        self.rng.shuffle(jugadores_copia)
         
         parejas = []
         n = len(jugadores_copia)
@@ -210,263 +309,313 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
             # El último jugador participa en una pareja adicional
             parejas.append((jugadores_copia[-1], jugadores_copia[0]))
         
-        print(f"\n[PAREJAS CREADAS] Total: {len(parejas)}")
-        for i, (p1, p2) in enumerate(parejas, 1):
-            print(f"  Pareja {i}: {p1} pregunta a {p2}")
-        print()
+        log.debug("Parejas creadas: %s", parejas)
         
         return parejas
     
     def procesar_entrada(self, texto_usuario):
         """IA interpreta y decide"""
-        print(f"\n{'='*60}")
-        print(f"[PROCESANDO] Entrada: '{texto_usuario}'")
-        print(f"[PROCESANDO] Fase actual: {self.fase}")
-        print(f"[PROCESANDO] Turno: {self.turno_actual}")
-        print(f"{'='*60}")
+        return "".join(self.procesar_entrada_stream(texto_usuario)).strip()
+    
+    def procesar_entrada_stream(self, texto_usuario):
+        """Igual que procesar_entrada, pero entrega la respuesta por fragmentos según llega de Gemini"""
+        log.debug("Entrada: %r (fase %s, turno %s)", texto_usuario, self.fase, self.turno_actual)
         
         self.historial_completo.append(f"Usuario: {texto_usuario}")
         
         # SIEMPRE intentar fallback primero
-        respuesta_fallback = self._respuesta_fallback(texto_usuario)
+        if trazador.activo:
+            with trazador.span("motor", fase=self.fase):
+                respuesta_fallback = self._respuesta_fallback(texto_usuario)
+        else:
+            respuesta_fallback = self._respuesta_fallback(texto_usuario)
         
         # Si el fallback dio una respuesta válida (con comando), usarla
         if respuesta_fallback:
-            print(f"[FALLBACK USADO] Respuesta: {respuesta_fallback[:100]}...")
+            self._tocar()
+            log.debug("Respuesta del motor: %.100s", respuesta_fallback)
             self.historial_completo.append(f"Jarvis: {respuesta_fallback}")
-            return respuesta_fallback
+            yield respuesta_fallback
+            return
         
-        print("[PROCESANDO] Fallback no manejó, intentando con IA...")
+        log.debug("El motor no manejó la entrada, intentando con IA")
+        
+        cacheada = self.cache_respuestas.obtener(self.fase, texto_usuario, len(self.jugadores))
+        if cacheada:
+            log.debug("Respuesta IA reutilizada de caché: %.100s", cacheada)
+            self.historial_completo.append(f"Jarvis: {cacheada}")
+            yield cacheada
+            return
         
         # Solo usar IA para casos complejos
         contexto = self._construir_contexto()
         prompt = self._generar_prompt(texto_usuario, contexto)
+        partes = []
         
         try:
-            self._esperar_rate_limit()
-            response = self.chat.send_message(prompt)
-            respuesta_ia = response.text.strip()
+            with trazador.span("espera_cupo"):
+                self._esperar_rate_limit()
+            # stream=True: cada fragmento sale hacia el TTS sin esperar la respuesta completa
+            inicio_llm = time.perf_counter()
+            for fragmento in self.historial_chat.enviar_stream(prompt):
+                if not partes:
+                    trazador.marca("llm_primer_fragmento")
+                partes.append(fragmento)
+                yield fragmento
+            # Incluye el tiempo que el consumidor (TTS) tarda en pedir el siguiente fragmento
+            if trazador.activo:
+                trazador.marca("llm_fin", segundos=round(time.perf_counter() - inicio_llm, 3))
+            respuesta_ia = "".join(partes).strip()
         
             self._procesar_comandos_ia(respuesta_ia, texto_usuario)
+            self._tocar()  # comandos de la IA y tamaño del historial
+            
+            if self._es_respuesta_cacheable(respuesta_ia):
+                self.cache_respuestas.guardar(self.fase, texto_usuario, len(self.jugadores), respuesta_ia)
             
             self.historial_completo.append(f"Jarvis: {respuesta_ia}")
-            print(f"[IA USADA] Respuesta: {respuesta_ia[:100]}...")
-            return respuesta_ia
+            log.debug("Respuesta IA: %.100s", respuesta_ia)
             
         except Exception as e:
             error_msg = str(e)
-            print(f"[ERROR IA] {error_msg}")
+            log.warning("Error IA: %s", error_msg)
+            
+            es_cuota = self._registrar_error_cuota(error_msg)
+            if partes:
+                # Ya se entregó parte de la respuesta; no mezclarla con un fallback
+                return
             
-            if "429" in error_msg or "quota" in error_msg.lower():
+            if es_cuota:
                 fallback_generico = self._respuesta_fallback_generica(texto_usuario)
-                return fallback_generico
+                yield fallback_generico
+                return
             
-            return "Disculpa, no he podido procesar eso. ¿Podrías repetirlo?"
+            yield "Disculpa, no he podido procesar eso. ¿Podrías repetirlo?"
+    
+    def _es_respuesta_cacheable(self, respuesta):
+        """Solo se cachea lo que no ejecuta comandos ni depende de quién está jugando"""
+        if not respuesta or re.search(r"\[[A-Z_]+(:[^\]]*)?\]", respuesta):
+            return False
+        respuesta_lower = respuesta.lower()
+        return not any(jugador.lower() in respuesta_lower for jugador in self.jugadores)
     
     def _respuesta_fallback_generica(self, texto):
         """Fallback ultra simple cuando todo falla"""
-        texto_lower = texto.lower()
+        if self.fase == Fase.VOTACION:
+            jugador, _ = self.intenciones.resolver_jugador(texto, self.jugadores)
+            if jugador:
+                return f"[VOTAR:{jugador}] Voto registrado."
+        return RESPUESTAS_GENERICAS.get(self.fase, "Continúa.")
+    
+    def _respuesta_fallback(self, texto):
+        """Respuestas básicas sin IA: intención detectada -> transición de la tabla"""
+        intencion, slots = self.intenciones.detectar(self.fase, texto, self.jugadores)
+        evento = intencion or "sin_intencion"
+        
+        log.debug("Fase: %s, texto: %r, evento: %s", self.fase, texto, evento)
+        return self.maquina.despachar(evento, slots, texto)
+    
+    def _construir_maquina(self):
+        """Tabla de transiciones del juego: (fase, evento) -> acción, destino y guarda"""
+        maquina = MaquinaEstados(Fase.INICIO)
+        F = Fase
+        
+        maquina.agregar(F.INICIO, "comenzar", self._al_comenzar, F.REGISTRO)
+        
+        maquina.agregar(F.REGISTRO, "fin_registro", self._al_cerrar_registro, F.MOSTRANDO_PALABRAS,
+                        guarda=lambda s, t: len(self.jugadores) >= 3)
+        maquina.agregar(F.REGISTRO, "fin_registro", self._al_faltan_jugadores)
+        maquina.agregar(F.REGISTRO, "nombre", self._al_nombre_repetido,
+                        guarda=lambda s, t: s["nombre"] in self.jugadores)
+        maquina.agregar(F.REGISTRO, "nombre", self._al_registrar_ultimo, F.MOSTRANDO_PALABRAS,
+                        guarda=lambda s, t: len(self.jugadores) + 1 >= 5)
+        maquina.agregar(F.REGISTRO, "nombre", self._al_registrar)
+        
+        maquina.agregar(F.MOSTRANDO_PALABRAS, "confirmar", self._al_ultimo_listo, F.JUGANDO,
+                        guarda=lambda s, t: self.turno_actual == len(self.jugadores) - 1)
+        maquina.agregar(F.MOSTRANDO_PALABRAS, "confirmar", self._al_jugador_listo,
+                        guarda=lambda s, t: self.turno_actual < len(self.jugadores))
+        
+        maquina.agregar(F.JUGANDO, "pista", self._al_ultima_pista, F.DECISION_RONDA,
+                        guarda=lambda s, t: self.turno_actual < len(self.orden_turnos)
+                        and self.turno_actual + 1 >= len(self.jugadores))
+        maquina.agregar(F.JUGANDO, "pista", self._al_pista,
+                        guarda=lambda s, t: self.turno_actual < len(self.orden_turnos))
+        
+        maquina.agregar(F.DECISION_RONDA, "otra_ronda", self._al_otra_ronda, F.JUGANDO)
+        maquina.agregar(F.DECISION_RONDA, "votar", self._al_iniciar_votacion, F.VOTACION)
+        # Si no detecta nada claro, asumir que quieren votar (para avanzar el juego)
+        maquina.agregar(F.DECISION_RONDA, "sin_intencion", self._al_votar_por_defecto, F.VOTACION)
+        
+        maquina.agregar(F.VOTACION, "votar_jugador", self._al_ultimo_voto, F.PREGUNTA_FINAL,
+                        guarda=lambda s, t: len(self.votos_impostor) == len(self.jugadores) - 1)
+        maquina.agregar(F.VOTACION, "votar_jugador", self._al_votar,
+                        guarda=lambda s, t: len(self.votos_impostor) < len(self.jugadores))
+        maquina.agregar(F.VOTACION, "votar_jugador", self._al_voto_invalido)
+        maquina.agregar(F.VOTACION, "sin_intencion", self._al_voto_invalido)
+        
+        # Cualquier respuesta avanza a la siguiente pareja o al resultado
+        for evento in ("confirmar", "respuesta"):
+            maquina.agregar(F.PREGUNTA_FINAL, evento, self._al_resultado_final, F.RESULTADO,
+                            guarda=lambda s, t: self.pareja_actual_index + 1 >= len(self.parejas_dinamica))
+            maquina.agregar(F.PREGUNTA_FINAL, evento, self._al_siguiente_pareja)
+        
+        # Comandos que escribe la IA; valen en cualquier fase
+        maquina.agregar(CUALQUIER_FASE, "cmd_iniciar", lambda s, t: None, F.REGISTRO)
+        maquina.agregar(CUALQUIER_FASE, "cmd_registrar", self._al_comando_registrar)
+        maquina.agregar(CUALQUIER_FASE, "cmd_iniciar_juego", lambda s, t: self._iniciar_juego(), F.MOSTRANDO_PALABRAS,
+                        guarda=lambda s, t: len(self.jugadores) >= 3 and self.fase != F.MOSTRANDO_PALABRAS)
+        return maquina
+    
+    # === INICIO ===
+    def _al_comenzar(self, slots, texto):
+        log.debug("-> REGISTRO")
+        return "[INICIAR] Excelente. Por favor, indíqueme el nombre del primer participante."
+    
+    # === REGISTRO ===
+    def _al_cerrar_registro(self, slots, texto):
+        self._iniciar_juego()
+        siguiente = self.jugadores[0]
+        return f"[INICIAR_JUEGO] Perfecto, {len(self.jugadores)} jugadores registrados. Ahora cada uno verá su palabra. Todos los demás, tápense los ojos o volteen la pantalla. {siguiente}, presiona 'Ver mi palabra' y cuando ya no salga en pantalla presiona el botón de Listo."
+    
+    def _al_faltan_jugadores(self, slots, texto):
+        return f"Necesitamos al menos 3 jugadores. Tenemos {len(self.jugadores)}."
+    
+    def _al_nombre_repetido(self, slots, texto):
+        return f"{slots['nombre']} ya está registrado. ¿Siguiente jugador?"
+    
+    def _registrar_jugador(self, nombre):
+        self.jugadores.append(nombre)
+        self.generos[nombre] = self.detectar_genero(nombre)
+        self.indice_nombres.agregar(nombre)
+        log.info("Registrado: %s", nombre)
+    
+    def _al_registrar_ultimo(self, slots, texto):
+        nombre = slots["nombre"]
+        self._registrar_jugador(nombre)
+        self._iniciar_juego()
+        siguiente = self.jugadores[0]
+        return f"[REGISTRAR:{nombre}] [INICIAR_JUEGO] Tenemos 5 jugadores. Iniciando juego. Todos los demás, tápense los ojos o volteen la pantalla. {siguiente}, presiona 'Ver mi palabra' y cuando ya no salga en pantalla presiona el botón de Listo."
+    
+    def _al_registrar(self, slots, texto):
+        nombre = slots["nombre"]
+        self._registrar_jugador(nombre)
+        return f"[REGISTRAR:{nombre}] Perfecto, {nombre} registrado. ¿Quién más va a jugar?"
+    
+    # === MOSTRANDO PALABRAS ===
+    def _marcar_jugador_listo(self):
+        jugador_actual = self.jugadores[self.turno_actual]
+        self.jugadores_listos.add(jugador_actual)
+        self.turno_actual += 1
+        log.debug("Jugador %s listo. Turno ahora: %s/%s", jugador_actual, self.turno_actual, len(self.jugadores))
+    
+    def _al_ultimo_listo(self, slots, texto):
+        self._marcar_jugador_listo()
+        log.info("Todos listos, iniciando fase de juego")
+        self.turno_actual = 0
+        self.orden_turnos = list(range(len(self.jugadores)))
+        self.rng.shuffle(self.orden_turnos)
+        primer_jugador = self.jugadores[self.orden_turnos[0]]
+        return f"[JUGADOR_LISTO] Excelente. Todos han visto sus palabras. Comenzamos con las pistas. {primer_jugador}, da tu primera pista."
+    
+    def _al_jugador_listo(self, slots, texto):
+        self._marcar_jugador_listo()
+        siguiente = self.jugadores[self.turno_actual]
+        return f"[JUGADOR_LISTO] Perfecto. Ahora todos los demás vean a otro lado. {siguiente}, presiona 'Ver mi palabra' y luego el botón de Listo."
+    
+    # === JUGANDO ===
+    def _guardar_pista(self, texto):
+        """Guarda la pista y devuelve el comentario, generado en paralelo mientras avanza el turno"""
+        jugador = self.jugadores[self.orden_turnos[self.turno_actual]]
+        
+        # El tiempo en la cola del ejecutor también cuenta contra el presupuesto
+        limite_comentario = time.monotonic() + self.presupuesto_comentario
+        # El genérico se elige aquí: el azar de la partida no depende de cuándo corre el hilo
+        generico = self.rng.choice(self.comentarios_fallback)
+        futuro_comentario = self._lanzar_comentario_pista(jugador, texto, limite_comentario, generico)
         
-        if self.fase == "mostrando_palabras":
-            return "[JUGADOR_LISTO] Perfecto, siguiente jugador por favor."
-        elif self.fase == "jugando":
-            return "[GUARDAR_PISTA] Entendido. Siguiente jugador."
-        elif self.fase == "votacion":
-            for jugador in self.jugadores:
-                if jugador.lower() in texto_lower:
-                    return f"[VOTAR:{jugador}] Voto registrado."
-        elif self.fase == "pregunta_final":
-            return "[RESPUESTA_PREGUNTA] Interesante respuesta. Siguiente pareja."
+        self.pistas_ronda.append(f"{jugador}: {texto}")
+        self.turno_actual += 1
         
-        return "Continúa."
+        log.debug("Pista guardada. Turno: %s/%s", self.turno_actual, len(self.jugadores))
+        
+        # Comentario tardío del turno anterior (solo si se pidió encolarlos)
+        previo = f"{self.comentarios_tardios.popleft()} " if self.comentarios_tardios else ""
+        return previo + self._esperar_comentario(futuro_comentario, limite_comentario, generico)
     
-    def _respuesta_fallback(self, texto):
-        """Respuestas básicas sin IA - MEJORADO"""
-        texto_lower = texto.lower()
-        
-        print(f"[FALLBACK CHECK] Fase: {self.fase}, Texto: '{texto_lower}'")
-        
-        # === INICIO ===
-        if self.fase == "inicio":
-            if "comenzar" in texto_lower or "empezar" in texto_lower or "dale" in texto_lower:
-                self.fase = "registro"
-                print("[FALLBACK] -> REGISTRO")
-                return "[INICIAR] Excelente. Por favor, indíqueme el nombre del primer participante."
-            return None
-        
-        # === REGISTRO ===
-        if self.fase == "registro":
-            # Detectar fin de registro
-            if any(palabra in texto_lower for palabra in ["último", "ultima", "listo", "ya estamos", "ya somos", "todos"]):
-                if len(self.jugadores) >= 3:
-                    self._iniciar_juego()
-                    siguiente = self.jugadores[0]
-                    return f"[INICIAR_JUEGO] Perfecto, {len(self.jugadores)} jugadores registrados. Ahora cada uno verá su palabra. Todos los demás, tápense los ojos o volteen la pantalla. {siguiente}, presiona 'Ver mi palabra' y cuando ya no salga en pantalla presiona el botón de Listo."
-                else:
-                    return f"Necesitamos al menos 3 jugadores. Tenemos {len(self.jugadores)}."
-            
-            # Extraer nombre
-            palabras = texto.split()
-            nombre = None
-            palabras_ignorar = ["soy", "me", "llamo", "es", "el", "ella", "yo", "mi", "nombre", "y"]
-            
-            for p in palabras:
-                p_clean = p.strip(".,;:!¿?").lower()
-                if p_clean not in palabras_ignorar and len(p_clean) > 2 and p_clean.isalpha():
-                    nombre = p.strip(".,;:!¿?").capitalize()
-                    break
-            
-            if nombre:
-                if nombre not in self.jugadores:
-                    self.jugadores.append(nombre)
-                    self.generos[nombre] = self.detectar_genero(nombre)
-                    print(f"[FALLBACK] Registrado: {nombre}")
-                    
-                    if len(self.jugadores) >= 5:
-                         self._iniciar_juego()
-                         siguiente = self.jugadores[0]
-                         return f"[REGISTRAR:{nombre}] [INICIAR_JUEGO] Tenemos 5 jugadores. Iniciando juego. Todos los demás, tápense los ojos o volteen la pantalla. {siguiente}, presiona 'Ver mi palabra' y cuando ya no salga en pantalla presiona el botón de Listo."
-                    
-                    return f"[REGISTRAR:{nombre}] Perfecto, {nombre} registrado. ¿Quién más va a jugar?"
-                else:
-                    return f"{nombre} ya está registrado. ¿Siguiente jugador?"
-            
-            return None
-        
-        # === MOSTRANDO PALABRAS ===
-        if self.fase == "mostrando_palabras":
-            # Detectar CUALQUIER confirmación
-            confirmaciones = ["listo", "ok", "ya", "entendido", "siguiente", "vi", "ví", "bien", "dale", "continuar"]
-            if any(palabra in texto_lower for palabra in confirmaciones):
-                print(f"[FALLBACK] Confirmación detectada. Turno actual antes: {self.turno_actual}")
-                
-                if self.turno_actual < len(self.jugadores):
-                    jugador_actual = self.jugadores[self.turno_actual]
-                    self.jugadores_listos.add(jugador_actual)
-                    self.turno_actual += 1
-                    
-                    print(f"[FALLBACK] Jugador {jugador_actual} listo. Turno ahora: {self.turno_actual}/{len(self.jugadores)}")
-                    print(f"[FALLBACK] Listos: {len(self.jugadores_listos)}/{len(self.jugadores)}")
-                    
-                    # Verificar si todos terminaron
-                    if self.turno_actual >= len(self.jugadores):
-                        print("[FALLBACK] ¡TODOS LISTOS! Iniciando fase de juego")
-                        self.fase = "jugando"
-                        self.turno_actual = 0
-                        self.orden_turnos = list(range(len(self.jugadores)))
-                        random.shuffle(self.orden_turnos)
-                        primer_jugador = self.jugadores[self.orden_turnos[0]]
-                        return f"[JUGADOR_LISTO] Excelente. Todos han visto sus palabras. Comenzamos con las pistas. {primer_jugador}, da tu primera pista."
-                    
-                    # Hay más jugadores
-                    siguiente = self.jugadores[self.turno_actual]
-                    return f"[JUGADOR_LISTO] Perfecto. Ahora todos los demás vean a otro lado. {siguiente}, presiona 'Ver mi palabra' y luego el botón de Listo."
-                
-            return None
-        
-        # === JUGANDO ===
-        if self.fase == "jugando":
-            if len(texto.strip()) > 2:
-                if self.turno_actual < len(self.orden_turnos):
-                    idx = self.orden_turnos[self.turno_actual]
-                    jugador = self.jugadores[idx]
-                    self.pistas_ronda.append(f"{jugador}: {texto}")
-                    
-                    # Generar comentario cómico
-                    comentario = self.generar_comentario_pista(jugador, texto)
-                    
-                    self.turno_actual += 1
-                    
-                    print(f"[FALLBACK] Pista guardada. Turno: {self.turno_actual}/{len(self.jugadores)}")
-                    
-                    if self.turno_actual >= len(self.jugadores):
-                        self.fase = "decision_ronda"
-                        return f"[GUARDAR_PISTA] {comentario} Todos han dado sus pistas. ¿Desean jugar otra ronda o ya votar?"
-                    
-                    siguiente_idx = self.orden_turnos[self.turno_actual]
-                    siguiente = self.jugadores[siguiente_idx]
-                    return f"[GUARDAR_PISTA] {comentario} {siguiente}, tu turno para dar una pista."
-            return None
-        
-        # === DECISIÓN RONDA ===
-        if self.fase == "decision_ronda":
-            print(f"[FALLBACK] En decisión_ronda, analizando: '{texto_lower}'")
-            
-            if any(palabra in texto_lower for palabra in ["otra", "más", "mas", "si", "sí", "continuar", "nueva", "ronda"]):
-                self.ronda_actual += 1
-                self.turno_actual = 0
-                self.pistas_ronda = []
-                self.fase = "jugando"
-                random.shuffle(self.orden_turnos)
-                primer_idx = self.orden_turnos[0]
-                primer_jugador = self.jugadores[primer_idx]
-                print(f"[FALLBACK] -> NUEVA RONDA, primer jugador: {primer_jugador}")
-                return f"[NUEVA_RONDA] De acuerdo, nueva ronda de pistas. {primer_jugador}, comienza."
-            elif any(palabra in texto_lower for palabra in ["votar", "votación", "votacion", "ya", "no", "terminar", "basta"]):
-                self.fase = "votacion"
-                self.turno_actual = 0
-                print(f"[FALLBACK] -> VOTACIÓN, primer votante: {self.jugadores[0]}")
-                return f"[INICIAR_VOTACION] Perfecto, iniciemos la votación. {self.jugadores[0]}, ¿a quién votas como impostor?"
-            
-            # Si no detecta nada claro, asumir que quieren votar (para avanzar el juego)
-            print(f"[FALLBACK] No detectó opción clara, pasando a VOTACIÓN por defecto")
-            self.fase = "votacion"
-            self.turno_actual = 0
-            return f"[INICIAR_VOTACION] Entendido, pasemos a votar. {self.jugadores[0]}, ¿a quién votas?"
-        
-        # === VOTACIÓN ===
-        if self.fase == "votacion":
-            print(f"[FALLBACK] En votación, texto: '{texto_lower}'")
-            print(f"[FALLBACK] Jugadores disponibles: {self.jugadores}")
-            
-            # Buscar nombre del votado
-            nombre_encontrado = None
-            for jugador in self.jugadores:
-                if jugador.lower() in texto_lower:
-                    nombre_encontrado = jugador
-                    break
-            
-            if nombre_encontrado:
-                votante_idx = len(self.votos_impostor)
-                if votante_idx < len(self.jugadores):
-                    votante = self.jugadores[votante_idx]
-                    self.votos_impostor[votante] = nombre_encontrado
-                    
-                    print(f"[FALLBACK] Voto registrado: {votante} -> {nombre_encontrado}")
-                    print(f"[FALLBACK] Votos actuales: {len(self.votos_impostor)}/{len(self.jugadores)}")
-                    
-                    if len(self.votos_impostor) >= len(self.jugadores):
-                        print("[FALLBACK] ¡VOTACIÓN COMPLETA! Iniciando dinámica final...")
-                        return self._iniciar_dinamica_final()
-                    
-                    siguiente_idx = len(self.votos_impostor)
-                    siguiente_votante = self.jugadores[siguiente_idx]
-                    return f"[VOTAR:{nombre_encontrado}] Voto registrado. {siguiente_votante}, ¿a quién votas?"
+    def _al_ultima_pista(self, slots, texto):
+        comentario = self._guardar_pista(texto)
+        return f"[GUARDAR_PISTA] {comentario} Todos han dado sus pistas. ¿Desean jugar otra ronda o ya votar?"
+    
+    def _al_pista(self, slots, texto):
+        comentario = self._guardar_pista(texto)
+        siguiente = self.jugadores[self.orden_turnos[self.turno_actual]]
+        return f"[GUARDAR_PISTA] {comentario} {siguiente}, tu turno para dar una pista."
+    
+    # === DECISIÓN RONDA ===
+    def _al_otra_ronda(self, slots, texto):
+        self.ronda_actual += 1
+        self.turno_actual = 0
+        self.pistas_ronda = []
+        self.rng.shuffle(self.orden_turnos)
+        primer_jugador = self.jugadores[self.orden_turnos[0]]
+        log.info("-> NUEVA RONDA, primer jugador: %s", primer_jugador)
+        return f"[NUEVA_RONDA] De acuerdo, nueva ronda de pistas. {primer_jugador}, comienza."
+    
+    def _al_iniciar_votacion(self, slots, texto):
+        self.turno_actual = 0
+        log.info("-> VOTACIÓN, primer votante: %s", self.jugadores[0])
+        return f"[INICIAR_VOTACION] Perfecto, iniciemos la votación. {self.jugadores[0]}, ¿a quién votas como impostor?"
+    
+    def _al_votar_por_defecto(self, slots, texto):
+        log.info("Sin opción clara, pasando a VOTACIÓN por defecto")
+        self.turno_actual = 0
+        return f"[INICIAR_VOTACION] Entendido, pasemos a votar. {self.jugadores[0]}, ¿a quién votas?"
+    
+    # === VOTACIÓN ===
+    def _registrar_voto(self, slots):
+        votante = self.jugadores[len(self.votos_impostor)]
+        self.votos_impostor[votante] = slots["jugador"]
+        log.info("Voto registrado: %s -> %s (confianza %.2f), %s/%s",
+                 votante, slots['jugador'], slots['confianza'], len(self.votos_impostor), len(self.jugadores))
+    
+    def _al_ultimo_voto(self, slots, texto):
+        self._registrar_voto(slots)
+        log.info("Votación completa, iniciando dinámica final")
+        return self._iniciar_dinamica_final()
+    
+    def _al_votar(self, slots, texto):
+        self._registrar_voto(slots)
+        siguiente_votante = self.jugadores[len(self.votos_impostor)]
+        return f"[VOTAR:{slots['jugador']}] Voto registrado. {siguiente_votante}, ¿a quién votas?"
+    
+    def _al_voto_invalido(self, slots, texto):
+        log.debug("No se detectó nombre válido en: %r", texto)
+        return "No detecté un nombre válido. Por favor, di el nombre del jugador que crees que es el impostor."
+    
+    # === PREGUNTA FINAL ===
+    def _al_siguiente_pareja(self, slots, texto):
+        self.pareja_actual_index += 1
+        return self._mostrar_siguiente_pareja()
+    
+    def _al_resultado_final(self, slots, texto):
+        # Todas las parejas completadas, mostrar resultado final
+        self.pareja_actual_index += 1
+        return self._mostrar_resultado_final()
+    
+    # === COMANDOS DE LA IA ===
+    def _al_comando_registrar(self, slots, texto):
+        try:
+            nombre = slots["respuesta"].split("[REGISTRAR:")[1].split("]")[0].strip()
+            nombre = nombre.replace(".", "").replace(",", "")
             
-            print(f"[FALLBACK] No se detectó nombre válido en: '{texto_lower}'")
-            return "No detecté un nombre válido. Por favor, di el nombre del jugador que crees que es el impostor."
-        
-        # === PREGUNTA FINAL - MODIFICADO PARA MÚLTIPLES PAREJAS ===
-        if self.fase == "pregunta_final":
-            # Cualquier respuesta avanza a la siguiente pareja o al resultado
-            confirmaciones = ["ok", "ya", "listo", "entendido", "bien", "siguiente"]
-            if any(palabra in texto_lower for palabra in confirmaciones) or len(texto.strip()) > 3:
-                self.pareja_actual_index += 1
-                
-                # Verificar si hay más parejas
-                if self.pareja_actual_index < len(self.parejas_dinamica):
-                    return self._mostrar_siguiente_pareja()
-                else:
-                    # Todas las parejas completadas, mostrar resultado final
-                    return self._mostrar_resultado_final()
-            return None
-        
-        return None
+            if nombre and nombre not in self.jugadores:
+                self._registrar_jugador(nombre)
+        except Exception as e:
+            log.warning("Error registrando: %s", e)
     
     def _iniciar_dinamica_final(self):
         """Inicia la dinámica de pregunta capciosa con múltiples parejas"""
-        self.fase = "pregunta_final"
-        
         # Crear parejas para que todos participen
         self.parejas_dinamica = self._crear_parejas_dinamica()
         self.pareja_actual_index = 0
@@ -483,7 +632,7 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
         self.preguntador, self.respondedor = self.parejas_dinamica[self.pareja_actual_index]
         
         # Seleccionar 3 preguntas aleatorias
-        self.preguntas_mostradas = random.sample(
+        self.preguntas_mostradas = self.rng.sample(
             self.preguntas_capciosas, 
             min(3, len(self.preguntas_capciosas))
         )
@@ -496,7 +645,7 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
         
         mensaje = f"[DINAMICA_FINAL] Perfecto, ahora {self.preguntador} vas a hacerle una pregunta a {self.respondedor}. Escoge una pregunta de las siguientes opciones:\n\n{preguntas_texto}\n\n y luego pregúntasela directamente a {self.respondedor}l. Una vez que haya respondido, dime por el micrófono un resumen de lo que dijo."
         
-        print(f"[DINAMICA] Pareja {pareja_num}/{total_parejas}: {self.preguntador} -> {self.respondedor}")
+        log.debug("Pareja %s/%s: %s -> %s", pareja_num, total_parejas, self.preguntador, self.respondedor)
         
         return mensaje
     
@@ -536,53 +685,31 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
         return f"{contexto}\nUsuario: {texto}\nResponde brevemente y usa comandos [ACCION] cuando corresponda."
     
     def _procesar_comandos_ia(self, respuesta, texto):
-        """Ejecuta comandos - SIMPLIFICADO porque ahora el fallback hace todo"""
-        # Esta función ahora es principalmente para cuando la IA responde
-        # pero el fallback ya maneja la mayoría de comandos
-        
-        if "[INICIAR]" in respuesta:
-            self.fase = "registro"
-        
-        elif "[REGISTRAR:" in respuesta:
-            try:
-                nombre = respuesta.split("[REGISTRAR:")[1].split("]")[0].strip()
-                nombre = nombre.replace(".", "").replace(",", "")
-                
-                if nombre and nombre not in self.jugadores:
-                    self.jugadores.append(nombre)
-                    self.generos[nombre] = self.detectar_genero(nombre)
-            except Exception as e:
-                print(f"Error registrando: {e}")
-        
-        elif "[INICIAR_JUEGO]" in respuesta:
-            if len(self.jugadores) >= 3 and self.fase != "mostrando_palabras":
-                self._iniciar_juego()
+        """Ejecuta el primer comando que escribió la IA a través de la misma tabla de transiciones"""
+        for etiqueta, evento in COMANDOS_IA:
+            if etiqueta in respuesta:
+                self.maquina.despachar(evento, {"respuesta": respuesta}, texto)
+                break
     
     def _iniciar_juego(self):
-        """Configuración inicial del juego"""
-        if self.fase == "mostrando_palabras":
-            return  # Ya está iniciado
-            
-        self.fase = "mostrando_palabras"
-        self.palabra_secreta = random.choice(self.palabras_ecuador)
+        """Configuración inicial del juego (la tabla lleva la fase a mostrando_palabras)"""
+        self.palabra_secreta = self.rng.choice(self.palabras_ecuador)
 
         indices_disponibles = list(range(len(self.jugadores)))
-        random.shuffle(indices_disponibles)
+        self.rng.shuffle(indices_disponibles)
         self.impostor_index = indices_disponibles[0]  # Mezclar bien los índices
 
         self.jugadores_listos = set()
         self.turno_actual = 0
         
-        print(f"\n{'='*40}")
-        print(f" INICIO DE PARTIDA")
-        print(f" Jugadores: {', '.join(self.jugadores)}")
-        print(f" Palabra secreta: {self.palabra_secreta}")
-        print(f" Impostor: {self.jugadores[self.impostor_index]} (índice {self.impostor_index})")
-        print(f"{'='*40}\n")
+        log.info("Inicio de partida. Jugadores: %s", ", ".join(self.jugadores))
+        log_secreto.debug("Palabra secreta: %s, impostor: %s (índice %s)",
+                          self.palabra_secreta, self.jugadores[self.impostor_index], self.impostor_index)
     
     def _determinar_ganador(self):
         """Cálculo de resultados"""
-        self.fase = "resultado"
+        # Fin de partida: la siguiente empieza con una sesión de chat limpia
+        self.historial_chat.reiniciar()
         
         conteo = {}
         for votado in self.votos_impostor.values():
@@ -595,56 +722,81 @@ Genera UN comentario corto (máximo 15 palabras), sutil y ligeramente cómico so
         impostor = self.jugadores[self.impostor_index]
         
         resultado = "Ganan los CIUDADANOS" if mas_votado == impostor else "Gana el IMPOSTOR"
-        print(f"\n[RESULTADO] {resultado}")
-        print(f"Más votado: {mas_votado} ({conteo[mas_votado]} votos)")
-        print(f"Impostor real: {impostor}\n")
+        log.info("Resultado: %s. Más votado: %s (%s votos), impostor real: %s",
+                 resultado, mas_votado, conteo[mas_votado], impostor)
         
         self.historial_completo.append(f"RESULTADO: {resultado}. Impostor era {impostor}.")
     
+    def gramatica_vosk(self, en_vocabulario=None):
+        """Gramática JSON para Vosk según la fase y los jugadores actuales, o None si es vocabulario abierto.
+
+        en_vocabulario(palabra): lo conoce el modelo (ver GestorModeloVosk.en_vocabulario)
+        """
+        return self.gramaticas.para(self.fase, self.jugadores, en_vocabulario)
+    
+    def _tocar(self):
+        """Marca que el estado visible cambió: la próxima foto se reconstruye y se avisa a los suscriptores"""
+        self.version += 1
+        if self.publicador_estado.hay_suscriptores:
+            self.publicador_estado.publicar(self.obtener_estado())
+    
+    def suscribir(self, callback, campos=None):
+        """callback(estado, cambios) cada vez que cambia el estado; ver PublicadorEstado.suscribir"""
+        return self.publicador_estado.suscribir(callback, campos)
+    
+    def obtener_estado(self):
+        """Foto inmutable del estado; solo se reconstruye si la versión cambió desde la última"""
+        estado = self._estado_ui
+        if estado is None or estado.version != self.version:
+            estado = self._construir_estado()
+            self._estado_ui = estado
+        return estado
+    
     def obtener_info_ui(self):
         """Retorna estado para la interfaz"""
-        info = {
-            "fase": self.fase,
-            "jugadores": self.jugadores,
-            "generos": self.generos,
-            "turno": self.turno_actual,
-            "jugador_actual": None,
-            "mostrando_a": None,
-            "es_impostor": False,
-            "palabra": None,
-            "listos": len(self.jugadores_listos),
-            "total_jugadores": len(self.jugadores),
-            "preguntador": self.preguntador,
-            "respondedor": self.respondedor,
-            "preguntas": self.preguntas_mostradas,
-            "pareja_actual": self.pareja_actual_index + 1 if self.fase == "pregunta_final" else 0,
-            "total_parejas": len(self.parejas_dinamica) if self.fase == "pregunta_final" else 0
-        }
-        
-        if self.fase == "mostrando_palabras" and self.turno_actual < len(self.jugadores):
-            info["mostrando_a"] = self.jugadores[self.turno_actual]
-            info["es_impostor"] = (self.turno_actual == self.impostor_index)
-            info["palabra"] = None if info["es_impostor"] else self.palabra_secreta
-            
-            print(f"\n[INFO UI] ============================")
-            print(f"  Mostrando a: {info['mostrando_a']} (turno {self.turno_actual})")
-            print(f"  Es impostor: {info['es_impostor']} (impostor_index={self.impostor_index})")
-            print(f"  Palabra: {info['palabra']}")
-            print(f"  Listos: {info['listos']}/{info['total_jugadores']}")
-            print(f"=============================\n")
-        
-        if self.fase == "jugando" and self.turno_actual < len(self.orden_turnos):
-            idx = self.orden_turnos[self.turno_actual]
-            info["jugador_actual"] = self.jugadores[idx]
+        return self.obtener_estado()
+    
+    def _construir_estado(self):
+        jugador_actual = mostrando_a = palabra = None
+        es_impostor = False
+        
+        if self.fase == Fase.MOSTRANDO_PALABRAS and self.turno_actual < len(self.jugadores):
+            mostrando_a = self.jugadores[self.turno_actual]
+            es_impostor = (self.turno_actual == self.impostor_index)
+            palabra = None if es_impostor else self.palabra_secreta
+        
+        if self.fase == Fase.JUGANDO and self.turno_actual < len(self.orden_turnos):
+            jugador_actual = self.jugadores[self.orden_turnos[self.turno_actual]]
             
-        if self.fase == "votacion":
+        if self.fase == Fase.VOTACION:
             votante_idx = len(self.votos_impostor)
             if votante_idx < len(self.jugadores):
-                info["jugador_actual"] = self.jugadores[votante_idx]
-                
-        return info
+                jugador_actual = self.jugadores[votante_idx]
+        
+        en_dinamica = self.fase == Fase.PREGUNTA_FINAL
+        return EstadoUI(
+            version=self.version,
+            fase=self.fase,
+            jugadores=tuple(self.jugadores),
+            generos=MappingProxyType(dict(self.generos)),
+            turno=self.turno_actual,
+            jugador_actual=jugador_actual,
+            mostrando_a=mostrando_a,
+            es_impostor=es_impostor,
+            palabra=palabra,
+            listos=len(self.jugadores_listos),
+            total_jugadores=len(self.jugadores),
+            preguntador=self.preguntador,
+            respondedor=self.respondedor,
+            preguntas=tuple(self.preguntas_mostradas),
+            pareja_actual=self.pareja_actual_index + 1 if en_dinamica else 0,
+            total_parejas=len(self.parejas_dinamica) if en_dinamica else 0,
+            tokens_historial=self.historial_chat.tokens_aproximados()
+        )
 
 if __name__ == "__main__":
+    from bitacora import configurar
+    configurar()
     juego = AsistenteImpostor()
     print("--- CONSOLA DE PRUEBA ---")
     while True:
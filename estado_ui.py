@@ -0,0 +1,104 @@
+import threading
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+
+from bitacora import registro
+
+log = registro("estado_ui")
+
+
+@dataclass(frozen=True, slots=True)
+class EstadoUI:
+    """Foto inmutable del estado del juego para la interfaz, etiquetada con la versión del motor.
+
+    Las colecciones son tuplas o vistas de solo lectura: quien la guarda no ve cambios
+    posteriores ni puede alterar el motor. Conserva `info["campo"]` e `info.get("campo")`
+    para el código que trataba el estado como dict.
+    """
+    version: int
+    fase: str
+    jugadores: tuple = ()
+    generos: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+    turno: int = 0
+    jugador_actual: str = None
+    mostrando_a: str = None
+    es_impostor: bool = False
+    palabra: str = None
+    listos: int = 0
+    total_jugadores: int = 0
+    preguntador: str = None
+    respondedor: str = None
+    preguntas: tuple = ()
+    pareja_actual: int = 0
+    total_parejas: int = 0
+    tokens_historial: int = 0
+
+    def __getitem__(self, campo):
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
+
+    def get(self, campo, defecto=None):
+        valor = getattr(self, campo, None)
+        return defecto if valor is None else valor
+
+    def a_dict(self):
+        """Versión serializable a JSON"""
+        datos = {f.name: getattr(self, f.name) for f in fields(self)}
+        datos["generos"] = dict(self.generos)
+        return datos
+
+    def diferencias(self, anterior):
+        """Nombres de los campos que cambiaron respecto a `anterior` (todos si es None)"""
+        if anterior is None:
+            return {f.name for f in fields(self)} - {"version"}
+        if anterior.version == self.version:
+            return set()
+        return {
+            f.name for f in fields(self)
+            if f.name != "version" and getattr(self, f.name) != getattr(anterior, f.name)
+        }
+
+
+class PublicadorEstado:
+    """Avisa a los suscriptores con (estado, campos_cambiados) cuando cambia la versión del motor"""
+
+    def __init__(self):
+        self._suscriptores = []  # (callback, campos o None)
+        self._ultimo = None
+        self._lock = threading.Lock()
+
+    def suscribir(self, callback, campos=None):
+        """callback(estado, cambios); con `campos` solo se llama si cambió alguno de ellos.
+
+        Se llama desde el hilo que procesa el turno: la interfaz debe pasarlo a su propio hilo.
+        Devuelve una función para cancelar la suscripción.
+        """
+        entrada = (callback, frozenset(campos) if campos else None)
+        with self._lock:
+            self._suscriptores.append(entrada)
+
+        def cancelar():
+            with self._lock:
+                if entrada in self._suscriptores:
+                    self._suscriptores.remove(entrada)
+        return cancelar
+
+    @property
+    def hay_suscriptores(self):
+        return bool(self._suscriptores)
+
+    def publicar(self, estado):
+        with self._lock:
+            cambios = estado.diferencias(self._ultimo)
+            self._ultimo = estado
+            suscriptores = list(self._suscriptores)
+        if not cambios:
+            return
+        for callback, campos in suscriptores:
+            if campos is None or campos & cambios:
+                try:
+                    callback(estado, cambios)
+                except Exception as e:
+                    log.exception("Error en suscriptor: %s", e)
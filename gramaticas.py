@@ -0,0 +1,61 @@
+import json
+import threading
+
+# Frases que Vosk puede reconocer en cada fase (con tildes: así están en el vocabulario del modelo).
+# Las fases que no aparecen aquí usan vocabulario abierto: registro y jugando (nombres y pistas libres),
+# pregunta_final, e inicio, donde se aceptan preguntas sobre las reglas ("¿cómo se juega?").
+FRASES_FASE = {
+    "mostrando_palabras": ["listo", "ok", "ya", "entendido", "siguiente", "ya la vi", "bien", "dale", "continuar"],
+    "decision_ronda": [
+        "otra ronda", "otra", "más", "sí", "continuar", "nueva ronda", "una ronda más",
+        "votar", "votación", "ya", "no", "terminar", "basta", "vamos a votar", "queremos votar"
+    ],
+    "votacion": ["voto por", "yo voto por", "creo que es", "el impostor es", "es"],
+}
+
+# Palabras de la fase que además se combinan con los nombres de los jugadores
+_FASES_CON_NOMBRES = {"votacion"}
+
+
+class GramaticasFase:
+    """Gramáticas JSON de Vosk por fase, construidas con el estado de la partida y cacheadas.
+
+    `para(fase, jugadores, en_vocabulario)` devuelve la cadena lista para `KaldiRecognizer`/`SetGrammar`,
+    o None si la fase necesita vocabulario abierto. "[unk]" permite que lo que no encaja
+    salga como desconocido en vez de forzarse a la palabra más parecida.
+
+    Vosk descarta en silencio las palabras de la gramática que no están en su vocabulario:
+    si algún jugador tiene un nombre que el modelo no conoce, la fase pasa a vocabulario
+    abierto para que el nombre llegue (aproximado) al resolvedor difuso de nombres.py.
+    """
+
+    def __init__(self, frases_fase=FRASES_FASE):
+        self.frases_fase = frases_fase
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def para(self, fase, jugadores=(), en_vocabulario=None):
+        frases = self.frases_fase.get(fase)
+        if frases is None:
+            return None
+        if fase in _FASES_CON_NOMBRES and en_vocabulario is not None:
+            if not all(en_vocabulario(palabra) for jugador in jugadores for palabra in jugador.lower().split()):
+                return None
+
+        clave = (fase, tuple(jugadores) if fase in _FASES_CON_NOMBRES else ())
+        with self._lock:
+            gramatica = self._cache.get(clave)
+            if gramatica is None:
+                gramatica = self._construir(frases, clave[1])
+                self._cache[clave] = gramatica
+            return gramatica
+
+    @staticmethod
+    def _construir(frases, jugadores):
+        opciones = list(frases)
+        for jugador in jugadores:
+            nombre = jugador.lower()
+            opciones.append(nombre)
+            opciones.extend(f"{prefijo} {nombre}" for prefijo in frases)
+        opciones.append("[unk]")
+        return json.dumps(list(dict.fromkeys(opciones)), ensure_ascii=False)
@@ -0,0 +1,67 @@
+import threading
+
+
+class HistorialChat:
+    """Sesión de chat con Gemini cuyo historial no crece sin límite.
+
+    Guarda solo los últimos `max_turnos` intercambios (pregunta + respuesta) de la
+    partida en curso; el contexto del juego ya viaja en cada prompt, así que lo
+    antiguo no aporta. `reiniciar()` abre una sesión limpia al terminar la partida.
+    """
+
+    def __init__(self, modelo, max_turnos=8):
+        self.modelo = modelo
+        self.max_turnos = max_turnos
+        self._lock = threading.Lock()  # ChatSession no es thread-safe
+        self.chat = self.modelo.start_chat(history=[])
+
+    def reiniciar(self):
+        with self._lock:
+            self.chat = self.modelo.start_chat(history=[])
+
+    def _recortar(self):
+        # Cada turno son dos mensajes (user, model); cortar siempre por un mensaje del usuario
+        historial = self.chat.history
+        exceso = len(historial) - 2 * self.max_turnos
+        if exceso > 0:
+            self.chat.history = historial[exceso + (exceso % 2):]
+
+    def enviar(self, prompt):
+        """Envía y devuelve el texto completo de la respuesta"""
+        with self._lock:
+            response = self.chat.send_message(prompt)
+            self._recortar()
+        return response.text
+
+    def enviar_stream(self, prompt):
+        """Envía y entrega la respuesta por fragmentos según llega.
+
+        El lock no se mantiene mientras se entregan fragmentos: si el consumidor deja de
+        iterar (p. ej. se interrumpe la voz), el siguiente turno no se queda bloqueado.
+        El intercambio solo se añade al historial si la respuesta llega completa.
+        """
+        with self._lock:
+            chat = self.chat
+            previo = list(chat.history)
+        sesion = self.modelo.start_chat(history=previo)
+        for chunk in sesion.send_message(prompt, stream=True):
+            yield chunk.text
+        nuevos = sesion.history[len(previo):]
+        with self._lock:
+            if self.chat is chat:  # si se reinició entretanto, el intercambio era de la partida anterior
+                self.chat.history = list(self.chat.history) + list(nuevos)
+                self._recortar()
+
+    def tokens_aproximados(self):
+        """Tamaño actual del historial en tokens (estimación local: ~4 caracteres por token)"""
+        caracteres = 0
+        for mensaje in self.chat.history:
+            for parte in mensaje.parts:
+                caracteres += len(getattr(parte, "text", "") or "")
+        return caracteres // 4
+
+    def contar_tokens(self):
+        """Tamaño exacto del historial según la API (hace una petición de red)"""
+        if not self.chat.history:
+            return 0
+        return self.modelo.count_tokens(self.chat.history).total_tokens
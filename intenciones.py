@@ -0,0 +1,131 @@
+import re
+import unicodedata
+
+# Palabras clave por fase, en orden de prioridad: si aparecen varias intenciones gana la primera.
+# Se comparan palabras completas y sin tildes ("sí" == "si", pero "no" ya no casa dentro de "nosotros").
+PALABRAS_CLAVE = {
+    "inicio": [
+        ("comenzar", ["comenzar", "empezar", "dale"]),
+    ],
+    "registro": [
+        ("fin_registro", ["ultimo", "ultima", "listo", "ya estamos", "ya somos", "todos"]),
+    ],
+    "mostrando_palabras": [
+        ("confirmar", ["listo", "ok", "ya", "entendido", "siguiente", "vi", "bien", "dale", "continuar"]),
+    ],
+    "decision_ronda": [
+        ("otra_ronda", ["otra", "mas", "si", "continuar", "nueva", "ronda"]),
+        ("votar", ["votar", "votacion", "ya", "no", "terminar", "basta"]),
+    ],
+    "pregunta_final": [
+        ("confirmar", ["ok", "ya", "listo", "entendido", "bien", "siguiente"]),
+    ],
+}
+
+PALABRAS_IGNORAR_NOMBRE = {"soy", "me", "llamo", "es", "el", "ella", "yo", "mi", "nombre", "y"}
+
+
+def plegar(texto):
+    """Minúsculas y sin tildes, para comparar sin depender de cómo transcribió Vosk"""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def _alternativa(palabras):
+    # Más largas primero para que "ya estamos" gane a "ya"
+    return "|".join(re.escape(p) for p in sorted(set(palabras), key=len, reverse=True))
+
+
+class MotorIntenciones:
+    """Reconoce la intención del jugador en una sola pasada, con patrones compilados una sola vez.
+
+    `detectar(fase, texto, jugadores)` devuelve (intencion, slots); intencion es None si
+    no se reconoce nada. Con un `indice_nombres` (nombres.IndiceNombres) los votos también
+    aceptan nombres mal transcritos.
+    """
+
+    def __init__(self, palabras_clave=PALABRAS_CLAVE, indice_nombres=None):
+        self.indice_nombres = indice_nombres
+        self.patrones = {}
+        self.prioridades = {}
+        for fase, intenciones in palabras_clave.items():
+            grupos = []
+            for prioridad, (intencion, palabras) in enumerate(intenciones):
+                grupos.append(f"(?P<{intencion}>{_alternativa(palabras)})")
+                self.prioridades[(fase, intencion)] = prioridad
+            self.patrones[fase] = re.compile(r"\b(?:" + "|".join(grupos) + r")\b")
+
+        self._jugadores_indexados = None
+        self._patron_jugadores = None
+        self._jugador_por_clave = {}
+
+    def _indexar_jugadores(self, jugadores):
+        """Índice nombre plegado -> jugador; solo se reconstruye si cambia la lista"""
+        clave = tuple(jugadores)
+        if clave == self._jugadores_indexados:
+            return
+        self._jugadores_indexados = clave
+        self._jugador_por_clave = {plegar(j): j for j in jugadores}
+        if self._jugador_por_clave:
+            self._patron_jugadores = re.compile(r"\b(" + _alternativa(self._jugador_por_clave) + r")\b")
+        else:
+            self._patron_jugadores = None
+
+    def buscar_jugador(self, texto, jugadores):
+        """Primer jugador registrado que aparece como palabra completa en el texto"""
+        self._indexar_jugadores(jugadores)
+        if self._patron_jugadores is None:
+            return None
+        m = self._patron_jugadores.search(plegar(texto))
+        return self._jugador_por_clave[m.group(1)] if m else None
+
+    def resolver_jugador(self, texto, jugadores):
+        """(jugador, confianza): primero la coincidencia exacta, si no la aproximada del índice"""
+        jugador = self.buscar_jugador(texto, jugadores)
+        if jugador:
+            return jugador, 1.0
+        if self.indice_nombres is None:
+            return None, 0.0
+        self.indice_nombres.sincronizar(jugadores)
+        return self.indice_nombres.resolver(texto)
+
+    def _intencion_por_palabras(self, fase, texto_plegado):
+        patron = self.patrones.get(fase)
+        if patron is None:
+            return None
+        mejor = None
+        for m in patron.finditer(texto_plegado):
+            intencion = m.lastgroup
+            if mejor is None or self.prioridades[(fase, intencion)] < self.prioridades[(fase, mejor)]:
+                mejor = intencion
+        return mejor
+
+    @staticmethod
+    def extraer_nombre(texto):
+        """Primera palabra que parece un nombre ("me llamo ana" -> "Ana")"""
+        for p in texto.split():
+            p_clean = p.strip(".,;:!¿?¡")
+            if p_clean.lower() not in PALABRAS_IGNORAR_NOMBRE and len(p_clean) > 2 and p_clean.isalpha():
+                return p_clean.capitalize()
+        return None
+
+    def detectar(self, fase, texto, jugadores=()):
+        intencion = self._intencion_por_palabras(fase, plegar(texto))
+        if intencion:
+            return intencion, {}
+
+        if fase == "registro":
+            nombre = self.extraer_nombre(texto)
+            if nombre:
+                return "nombre", {"nombre": nombre}
+        elif fase == "jugando":
+            if len(texto.strip()) > 2:
+                return "pista", {"pista": texto}
+        elif fase == "votacion":
+            jugador, confianza = self.resolver_jugador(texto, jugadores)
+            if jugador:
+                return "votar_jugador", {"jugador": jugador, "confianza": confianza}
+        elif fase == "pregunta_final":
+            if len(texto.strip()) > 3:
+                return "respuesta", {}
+        return None, {}
@@ -1,23 +1,31 @@
 import tkinter as tk
 from tkinter import font as tkfont
 from PIL import Image, ImageTk, ImageDraw
-import sounddevice as sd
-import numpy as np
-import pygame
 import json
-from vosk import Model, KaldiRecognizer
-import edge_tts
-import asyncio
 import os
+import queue
 import threading
-from dotenv import load_dotenv
 from demo_mdi_ia import AsistenteImpostor
+from cache_tts import CacheTTS
+from pipeline_voz import DivisorFrases, PipelineVoz
+from bucle_async import BucleAsync
+from trazas import trazador
+from bitacora import configurar, registro
 import re
 
-load_dotenv()
+log = registro("ui")
 
 class InterfazImpostor:
-    def __init__(self, root):
+    def __init__(self, root, asistente=None, tts=None, asr=None):
+        """asistente, tts y asr se pueden inyectar (ver servicios.py); por defecto Gemini, Edge-TTS y Vosk"""
+        # Audio y voz se importan aquí: importar este módulo no arrastra numpy, PortAudio ni pygame
+        import pygame
+        from reconocimiento import GestorModeloVosk, ReconocedorStreaming, EscuchaContinua
+        from captura import BufferCircular, CapturaMicrofono, frecuencia_modelo
+        from vad import DetectorVoz
+        from reproductor import ReproductorAudio
+        from servicios import TTSEdge
+        
         self.root = root
         self.root.title("Jarvis - El Impostor Ecuatoriano")
         self.root.geometry("1000x1015")
@@ -41,14 +49,26 @@ class InterfazImpostor:
         self.root.configure(bg=self.C_FONDO_MAIN)
         
         # Asistente
-        self.asistente = AsistenteImpostor()
+        self.asistente = asistente if asistente is not None else AsistenteImpostor()
         
-        # Audio config
-        self.fs = 44100
+        # Audio config: capturamos directamente a la frecuencia del modelo (16 kHz mono int16)
+        self.fs = frecuencia_modelo("model")
         self.grabando = False
-        self.buffer = []
-        self.stream = None
+        self.max_segundos_locucion = 30
+        # Un solo array preasignado para toda la locución; lo que pase del máximo se descarta
+        self.buffer = BufferCircular(
+            self.fs * self.max_segundos_locucion,
+            limite_total=self.fs * self.max_segundos_locucion
+        )
+        self.captura = CapturaMicrofono(self.fs, self.audio_callback)
+        
+        # Manos libres: micrófono siempre abierto, el VAD decide cuándo empieza y termina el turno
+        self.manos_libres = False
+        self.anillo_continuo = BufferCircular(self.fs * 2)
         self.procesando = False 
+        self.reconocimiento_streaming = True  # Decodificar mientras se mantiene el botón
+        self.streaming = None
+        self._estado_ui = None  # última foto del motor que se pintó (ver actualizar_ui)
         
         # Variables de Animación GIF
         self.frames_gif = []
@@ -56,21 +76,32 @@ class InterfazImpostor:
         self.animando = False
         self.gif_delay = 50 # Velocidad del GIF (menor número = más rápido)
         
-        # VOSK
-        print("Cargando VOSK...")
-        try:
-            if not os.path.exists("model"):
-                print("ERROR: No se encuentra la carpeta 'model'.")
-                self.rec_vosk = None
-            else:
-                self.vosk_model = Model("model")
-                self.rec_vosk = KaldiRecognizer(self.vosk_model, self.fs)
-        except Exception as e:
-            print(f"Error VOSK: {e}")
-            self.rec_vosk = None
+        # VOSK: el modelo es compartido por el proceso y se carga en segundo plano (ver crear_interfaz)
+        self.gestor_vosk = asr if asr is not None else GestorModeloVosk.compartido("model", self.fs)
+        self.streaming = ReconocedorStreaming(self.gestor_vosk, self.buffer, al_parcial=self._mostrar_parcial)
+        self.escucha = EscuchaContinua(
+            self.gestor_vosk,
+            self.anillo_continuo,
+            DetectorVoz(self.fs),
+            al_final=self._al_final_manos_libres,
+            al_parcial=self._mostrar_parcial
+        )
+        self._actualizar_gramatica()
+        
+        # TTS: las frases repetidas (saludo, confirmaciones) salen del cache sin ir a la red
+        self.voz_tts = "es-EC-LuisNeural"
+        self.tts = tts if tts is not None else TTSEdge()
+        self.bucle = BucleAsync.compartido()  # event loop único para toda la red, no uno por frase
+        self.cache_tts = CacheTTS("cache_tts")
         
         # Pygame
         pygame.mixer.init()
+        self.reproductor = ReproductorAudio()
+        self.pipeline_voz = PipelineVoz(
+            sintetizar=self._sintetizar,
+            reproducir=self.reproductor.reproducir,
+            limpiar=self.limpiar_comandos
+        )
         
         # Cargar imagen/GIF
         self.cargar_imagen_ia()
@@ -78,6 +109,9 @@ class InterfazImpostor:
         # Crear interfaz
         self.crear_interfaz()
         
+        # La ventana ya está dibujada: ahora sí cargar VOSK sin bloquear el hilo de Tk
+        self.gestor_vosk.cargar_en_segundo_plano(al_progreso=self._progreso_vosk)
+        
         # Saludo inicial
         self.root.after(1000, self.saludo_inicial)
     
@@ -112,8 +146,7 @@ class InterfazImpostor:
                 raise Exception("GIF sin frames")
 
         except Exception as e:
-            print(f"Advertencia de imagen: {e}")
-            print(f"Usando imagen generada (Fallback modo oscuro)")
+            log.warning("Advertencia de imagen: %s. Usando imagen generada (modo oscuro)", e)
             
             self.animando = False
             size = 180
@@ -267,6 +300,23 @@ class InterfazImpostor:
         )
         self.btn_listo.pack(side="left", padx=20)
         
+        self.btn_manos_libres = tk.Button(
+            frame_botones,
+            text="MANOS LIBRES",
+            font=self.font_btn,
+            bg=self.C_BOTON_BG,
+            fg=self.C_AZUL_IA,
+            activebackground=self.C_BOTON_ACTIVE,
+            activeforeground=self.C_AZUL_IA,
+            command=self.alternar_manos_libres,
+            relief="flat",
+            bd=0,
+            padx=30,
+            pady=15,
+            cursor="hand2"
+        )
+        self.btn_manos_libres.pack(side="left", padx=20)
+        
         # Estado
         self.label_estado = tk.Label(
             self.root,
@@ -277,6 +327,16 @@ class InterfazImpostor:
         )
         self.label_estado.pack(pady=10)
     
+    def _progreso_vosk(self, estado, segundos):
+        """Informa de la carga del modelo (llamado desde el hilo del gestor)"""
+        if estado == "cargando":
+            texto = f"Cargando modelo de voz... {segundos:.1f} s"
+        elif estado == "listo":
+            texto = f"Modelo de voz listo ({segundos:.1f} s)"
+        else:
+            texto = "Error VOSK: no se pudo cargar el modelo"
+        self.root.after(0, lambda: self.label_estado.config(text=texto))
+    
     def saludo_inicial(self):
         """Saludo en hilo separado"""
         threading.Thread(target=self._saludo_thread, daemon=True).start()
@@ -294,6 +354,23 @@ class InterfazImpostor:
         self.texto_conv.see("end")
         self.texto_conv.config(state="disabled")
     
+    def abrir_mensaje_app(self):
+        self.texto_conv.config(state="normal")
+        self.texto_conv.insert("end", "> ", "app")
+        self.texto_conv.config(state="disabled")
+    
+    def agregar_frase_app(self, frase):
+        self.texto_conv.config(state="normal")
+        self.texto_conv.insert("end", frase + " ", "app")
+        self.texto_conv.see("end")
+        self.texto_conv.config(state="disabled")
+    
+    def cerrar_mensaje_app(self):
+        self.texto_conv.config(state="normal")
+        self.texto_conv.insert("end", "\n\n", "app")
+        self.texto_conv.see("end")
+        self.texto_conv.config(state="disabled")
+    
     def agregar_mensaje_usuario(self, nombre, texto):
         self.texto_conv.config(state="normal")
         self.texto_conv.insert("end", f"> {nombre}: ", "user")
@@ -302,23 +379,28 @@ class InterfazImpostor:
         self.texto_conv.config(state="disabled")
     
     def iniciar_grabacion(self, event):
-        if not self.grabando and not self.procesando:
+        if not self.gestor_vosk.disponible:
+            self.label_estado.config(text="Error VOSK" if self.gestor_vosk.fallo else "Cargando modelo de voz...")
+            return
+        if not self.reproductor.terminado.is_set():
+            # Pulsar mientras Jarvis habla lo interrumpe
+            self.reproductor.detener()
+            return
+        if not self.grabando and not self.procesando and not self.manos_libres:
             try:
                 self.grabando = True
-                self.buffer = []
+                self.buffer.reiniciar()
+                if self.reconocimiento_streaming and self.streaming:
+                    self.streaming.iniciar()
                 self.btn_grabar.config(text="ESCUCHANDO...", bg=self.C_ROJO_BG_ACT, fg=self.C_ROJO_BTN)
                 self.label_estado.config(text="Escuchando...")
                 
-                self.stream = sd.InputStream(
-                    callback=self.audio_callback,
-                    channels=1,
-                    samplerate=self.fs,
-                    blocksize=4000
-                )
-                self.stream.start()
+                self.captura.abrir()
             except Exception as e:
-                print(f"Error Mic: {e}")
+                log.error("Error Mic: %s", e)
                 self.grabando = False
+                if self.reconocimiento_streaming and self.streaming:
+                    self.streaming.finalizar()
                 self.label_estado.config(text="Error de micrófono")
     
     def detener_grabacion(self, event):
@@ -327,68 +409,143 @@ class InterfazImpostor:
             self.btn_grabar.config(text="MANTÉN PARA HABLAR", bg=self.C_BOTON_BG, fg=self.C_ROJO_BTN)
             self.label_estado.config(text="Procesando...")
             
-            if self.stream:
-                try:
-                    self.stream.stop()
-                    self.stream.close()
-                except:
-                    pass
+            trazador.nuevo_turno("soltar")
+            self.captura.cerrar()
             
-            if len(self.buffer) > 0:
+            if self.buffer.total_escrito > 0:
                 self.procesando = True
                 threading.Thread(target=self._procesar_audio_thread, daemon=True).start()
             else:
+                if self.reconocimiento_streaming and self.streaming:
+                    self.streaming.finalizar()
                 self.label_estado.config(text="Audio muy corto")
     
-    def audio_callback(self, indata, frames, time, status):
-        if status:
-            print(status)
-        self.buffer.append(indata.copy())
+    def alternar_manos_libres(self):
+        """Activa/desactiva la escucha continua con detección de voz"""
+        if not self.gestor_vosk.disponible:
+            self.label_estado.config(text="Error VOSK" if self.gestor_vosk.fallo else "Cargando modelo de voz...")
+            return
+        
+        if not self.manos_libres:
+            if self.grabando:
+                return
+            try:
+                self.anillo_continuo.reiniciar()
+                self.manos_libres = True
+                self.escucha.iniciar()
+                if self.procesando:
+                    self.escucha.pausar()
+                self.captura.abrir()
+            except Exception as e:
+                log.error("Error Mic: %s", e)
+                self.manos_libres = False
+                self.escucha.detener()
+                self.label_estado.config(text="Error de micrófono")
+                return
+            self.btn_manos_libres.config(text="MANOS LIBRES: ON", bg=self.C_VERDE_BG_ACT)
+            self.btn_grabar.config(state="disabled", cursor="arrow")
+            self.label_estado.config(text="Escuchando (manos libres)...")
+        else:
+            self.manos_libres = False
+            self.captura.cerrar()
+            self.escucha.detener()
+            self.btn_manos_libres.config(text="MANOS LIBRES", bg=self.C_BOTON_BG)
+            self.btn_grabar.config(state="normal", cursor="hand2")
+            self.label_estado.config(text="Esperando...")
+    
+    def _al_final_manos_libres(self, texto):
+        """El VAD cerró una locución: procesarla como si se hubiera soltado el botón"""
+        if self.procesando:
+            return
+        self.procesando = True
+        self.escucha.pausar()
+        trazador.nuevo_turno("fin_de_voz")
+        threading.Thread(target=self._procesar_audio_thread, args=(texto,), daemon=True).start()
+    
+    def _pausar_escucha(self):
+        if self.manos_libres:
+            self.escucha.pausar()
+    
+    def _reanudar_escucha(self):
+        if self.manos_libres and not self.procesando:
+            self.escucha.reanudar()
+    
+    def audio_callback(self, bloque):
+        """Recibe bloques int16 a self.fs desde CapturaMicrofono (hilo de audio, sin asignaciones)"""
+        if self.manos_libres:
+            self.anillo_continuo.escribir(bloque)
+            self.escucha.alimentar()
+            return
+        
+        desbordado = self.buffer.desbordado
+        self.buffer.escribir(bloque)
+        if self.reconocimiento_streaming and self.streaming:
+            self.streaming.alimentar()
+        
+        if self.buffer.desbordado and not desbordado:
+            # Locución máxima alcanzada: cortar como si se hubiera soltado el botón
+            self.root.after(0, lambda: self.detener_grabacion(None))
+    
+    def _mostrar_parcial(self, parcial):
+        """Muestra en vivo lo que Vosk va entendiendo"""
+        if self.grabando or self.manos_libres:
+            self.root.after(0, lambda: self.label_estado.config(text=f"Escuchando: {parcial}"))
+    
+    def _transcribir(self):
+        """Devuelve el texto de la locución recién grabada"""
+        if self.reconocimiento_streaming and self.streaming:
+            # El worker ya decodificó casi todo mientras se hablaba
+            return self.streaming.finalizar()
+        
+        audio_bytes = b"".join(vista.tobytes() for vista in self.buffer.vistas())
+        
+        with self.gestor_vosk.prestar(gramatica=self.streaming.gramatica) as rec:
+            if rec.AcceptWaveform(audio_bytes):
+                resultado = json.loads(rec.Result())
+            else:
+                resultado = json.loads(rec.FinalResult())
+        return resultado.get("text", "")
     
-    def _procesar_audio_thread(self):
-        """Procesamiento de audio en hilo secundario"""
-        if self.rec_vosk is None:
+    def _procesar_audio_thread(self, texto=None):
+        """Procesamiento de audio en hilo secundario (texto ya transcrito en modo manos libres)"""
+        if not self.gestor_vosk.disponible:
              self.root.after(0, lambda: self.agregar_mensaje_app("[ERROR: VOSK no cargado]"))
              self.procesando = False
              self.root.after(0, lambda: self.label_estado.config(text="Error VOSK"))
              return
 
         try:
-            datos = np.concatenate(self.buffer, axis=0)
-            audio_int16 = (datos * 32767).astype(np.int16)
-            audio_bytes = audio_int16.tobytes()
-            
-            texto = ""
-            if self.rec_vosk.AcceptWaveform(audio_bytes):
-                resultado = json.loads(self.rec_vosk.Result())
-                texto = resultado.get("text", "")
-            else:
-                resultado = json.loads(self.rec_vosk.FinalResult())
-                texto = resultado.get("text", "")
+            if texto is None:
+                with trazador.span("transcripcion"):
+                    texto = self._transcribir()
+            trazador.marca("transcrito")
             
             if texto and len(texto) > 2:
-                info = self.asistente.obtener_info_ui()
+                info = self.asistente.obtener_estado()
                 nombre = info.get("jugador_actual") or info.get("mostrando_a") or "Usuario"
                 self.root.after(0, lambda: self.agregar_mensaje_usuario(nombre, texto))
                 self.root.after(0, lambda: self.label_estado.config(text="Pensando..."))
                 
-                respuesta = self.asistente.procesar_entrada(texto)
-                respuesta_limpia = self.limpiar_comandos(respuesta)
-                
-                self.root.after(0, lambda: self.agregar_mensaje_app(respuesta_limpia))
-                self.root.after(0, lambda: self.label_estado.config(text="Hablando..."))
-                
-                self.texto_a_voz(respuesta_limpia)
+                # LLM → frases → TTS → altavoz, todo solapado; el texto aparece según se va diciendo
+                self.root.after(0, self.abrir_mensaje_app)
+                self.hablar_fragmentos(
+                    self.asistente.procesar_entrada_stream(texto),
+                    al_frase=lambda frase: self.root.after(0, lambda: self.agregar_frase_app(frase))
+                )
+                # Antes de reanudar la escucha, para que la próxima locución ya use la gramática nueva
+                self._actualizar_gramatica()
+                self.root.after(0, self.cerrar_mensaje_app)
                 self.root.after(0, self.actualizar_ui)
                 
             else:
                 self.root.after(0, lambda: self.label_estado.config(text="No entendí, intenta de nuevo"))
                 
         except Exception as e:
-            print(f"Error Processing: {e}")
+            log.error("Error procesando: %s", e)
             self.root.after(0, lambda: self.label_estado.config(text="Error interno"))
         finally:
             self.procesando = False
+            self._reanudar_escucha()
             self.root.after(0, lambda: self.label_estado.config(text="Esperando..."))
 
     def limpiar_comandos(self, texto):
@@ -424,16 +581,30 @@ class InterfazImpostor:
         
         self.frame_preguntas.pack(pady=10, fill="x")
     
+    def _actualizar_gramatica(self):
+        """Restringe el vocabulario de Vosk a lo que tiene sentido en la fase actual"""
+        gramatica = self.asistente.gramatica_vosk(self.gestor_vosk.en_vocabulario)
+        # Se aplica al abrir la siguiente locución; la que esté en curso no cambia
+        self.streaming.gramatica = gramatica
+        self.escucha.gramatica = gramatica
+    
     def actualizar_ui(self):
-        """Actualiza estado de botones"""
-        info = self.asistente.obtener_info_ui()
+        """Actualiza estado de botones; solo toca lo que cambió desde la última foto del motor"""
+        info = self.asistente.obtener_estado()
+        cambios = info.diferencias(self._estado_ui)
+        if not cambios:
+            return
+        self._estado_ui = info
         fase = info["fase"]
+        self._actualizar_gramatica()
         
-        self.frame_palabra.pack_forget()
-        self.frame_preguntas.pack_forget()
-        self.label_contador_parejas.pack_forget()
-        self.btn_listo.config(state="disabled", cursor="arrow")
-        self.btn_ver_palabra.config(state="normal")
+        if cambios & {"fase", "mostrando_a", "pareja_actual"}:
+            # Cambio de pantalla: ocultar paneles de la fase/turno anterior
+            self.frame_palabra.pack_forget()
+            self.frame_preguntas.pack_forget()
+            self.label_contador_parejas.pack_forget()
+            self.btn_listo.config(state="disabled", cursor="arrow")
+            self.btn_ver_palabra.config(state="normal")
         
         if self.label_central.cget("text") == "":
              self.label_central.config(image=self.img_ia)
@@ -491,7 +662,7 @@ class InterfazImpostor:
         """Muestra la palabra reemplazando la imagen y pausando animación"""
         self.animando = False
         
-        info = self.asistente.obtener_info_ui()
+        info = self.asistente.obtener_estado()
         es_impostor = info.get("es_impostor", False)
         palabra = info.get("palabra")
         
@@ -548,50 +719,85 @@ class InterfazImpostor:
             self.root.after(0, self.actualizar_ui)
             
         except Exception as e:
-            print(f"Error listo: {e}")
+            log.error("Error listo: %s", e)
             self.root.after(0, lambda: self.label_estado.config(text="Error al procesar"))
     
-    async def generar_audio_edge(self, text, output_file):
-        """Genera audio con voz ecuatoriana usando Edge-TTS"""
-        voice = "es-EC-LuisNeural" 
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_file)
+    async def generar_audio_edge(self, text, cola):
+        """Envía a la cola los fragmentos MP3 del servicio TTS según llegan (None al terminar)"""
+        try:
+            async for datos in self.tts.stream(text, self.voz_tts):
+                cola.put(datos)
+        except Exception as e:
+            cola.put(e)
+        finally:
+            cola.put(None)
+
+    def _sintetizar(self, text):
+        """Arranca ya la síntesis de una frase y devuelve el iterable de bytes MP3 para el reproductor"""
+        datos = self.cache_tts.obtener(self.voz_tts, text)
+        if datos is not None:
+            trazador.marca("tts_primer_byte", cache=True)
+            return datos  # Acierto: MP3 completo en memoria, ni red ni disco
+        
+        cola = queue.Queue()
+        self.bucle.enviar(self.generar_audio_edge(text, cola))
+        return self._fragmentos_tts(text, cola)
+
+    def _fragmentos_tts(self, text, cola):
+        """Entrega los fragmentos según llegan y guarda el audio completo en el cache"""
+        recibido = bytearray()
+        for fragmento in iter(cola.get, None):
+            if isinstance(fragmento, Exception):
+                raise fragmento
+            if not recibido:
+                trazador.marca("tts_primer_byte", caracteres=len(text))
+            recibido.extend(fragmento)
+            yield fragmento
+        
+        if recibido:
+            self.cache_tts.guardar(self.voz_tts, text, bytes(recibido))
+        else:
+            log.error("No se generó audio")
 
     def texto_a_voz(self, text):
         """TTS Edge-TTS (ejecutado en hilo separado)"""
-        if self.rec_vosk is None:
-             print(f"[AUDIO SIMULADO]: {text}")
-             return
+        self.hablar_fragmentos([text])
+
+    def hablar_fragmentos(self, fragmentos, al_frase=None):
+        """Habla texto que llega por fragmentos: cada frase se sintetiza mientras suena la anterior"""
+        if self.gestor_vosk.fallo or self.tts.sin_audio:
+            for frase in DivisorFrases().frases(fragmentos):
+                frase = self.limpiar_comandos(frase)
+                if frase and al_frase:
+                    al_frase(frase)
+                log.info("Audio simulado: %s", frase)
+            return
 
+        # En manos libres no queremos que el micrófono escuche a Jarvis
+        self._pausar_escucha()
+        self.reproductor.rearmar()
+        primera = []
+        
+        def al_sonar(frase, hablada):
+            if hablada and not primera:
+                primera.append(frase)
+                trazador.marca("reproduccion_inicio")
+            if al_frase:
+                al_frase(frase)
+        
         try:
             self.root.after(0, lambda: self.label_estado.config(text="Jarvis hablando..."))
-            
-            archivo_audio = "temp_jarvis.mp3"
-            
-            if os.path.exists(archivo_audio):
-                try:
-                    os.remove(archivo_audio)
-                except:
-                    pass
-
-            asyncio.run(self.generar_audio_edge(text, archivo_audio))
-            
-            if os.path.exists(archivo_audio):
-                pygame.mixer.music.load(archivo_audio)
-                pygame.mixer.music.play()
-                
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-                
-                pygame.mixer.music.unload()
-            else:
-                 print("Error: No se generó el archivo de audio.")
-            
-            self.root.after(0, lambda: self.label_estado.config(text="Listo para continuar"))
+            with trazador.span("voz"):
+                self.pipeline_voz.hablar(fragmentos, al_sonar)
+            trazador.marca("reproduccion_fin")
+            estado = "Interrumpido" if self.reproductor.interrumpido else "Listo para continuar"
+            self.root.after(0, lambda: self.label_estado.config(text=estado))
             
         except Exception as e:
-            print(f"Error TTS: {e}")
+            log.error("Error TTS: %s", e)
             self.root.after(0, lambda: self.label_estado.config(text="Error en audio"))
+        finally:
+            self._reanudar_escucha()
 
 def main():
     try:
@@ -599,7 +805,8 @@ def main():
         windll.shcore.SetProcessDpiAwareness(1)
     except:
         pass
-        
+    
+    configurar()
     root = tk.Tk()
     app = InterfazImpostor(root)
     root.mainloop()
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import re
+import threading
+import time
+
+
+class CuboTokens:
+    """Limitador token bucket: ráfagas de hasta `capacidad` peticiones y recarga de `tasa` por segundo.
+
+    Cada petición reserva su token al pedirlo (el saldo puede quedar negativo), así que
+    quien llega calcula su espera exacta una sola vez y nadie compite en un bucle.
+    """
+
+    def __init__(self, tasa=0.5, capacidad=4):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = float(capacidad)
+        self.ultimo = time.monotonic()
+        self.bloqueado_hasta = 0.0  # tras un 429 nadie pasa antes de este instante
+        self._lock = threading.Lock()
+
+    def _reservar(self, n, max_espera):
+        """Reserva n tokens y devuelve cuánto hay que esperar, o None si superaría max_espera"""
+        with self._lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+            self.ultimo = ahora
+
+            deficit = n - self.tokens
+            espera = max(deficit / self.tasa if deficit > 0 else 0.0, self.bloqueado_hasta - ahora)
+            if max_espera is not None and espera > max_espera:
+                return None
+            self.tokens -= n
+            return espera
+
+    def adquirir(self, n=1, timeout=None):
+        """Bloquea lo justo para respetar el límite. False si habría que esperar más de timeout"""
+        espera = self._reservar(n, timeout)
+        if espera is None:
+            return False
+        if espera > 0:
+            time.sleep(espera)
+        return True
+
+    async def adquirir_async(self, n=1, timeout=None):
+        espera = self._reservar(n, timeout)
+        if espera is None:
+            return False
+        if espera > 0:
+            await asyncio.sleep(espera)
+        return True
+
+    def penalizar(self, segundos):
+        """El servidor respondió 429/cuota: vaciar el cubo y frenar a todos durante `segundos`"""
+        with self._lock:
+            ahora = time.monotonic()
+            self.tokens = min(self.tokens, 0.0)
+            self.ultimo = ahora
+            self.bloqueado_hasta = max(self.bloqueado_hasta, ahora + segundos)
+
+
+_RETRY = re.compile(r"retry in ([\d.]+)\s*s|retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE)
+
+
+def segundos_de_reintento(mensaje_error, por_defecto=10.0):
+    """Extrae el 'retry in Xs' que manda Gemini en los errores de cuota"""
+    m = _RETRY.search(mensaje_error)
+    if not m:
+        return por_defecto
+    return float(m.group(1) or m.group(2))
+
+
+_limitadores = {}
+_lock_limitadores = threading.Lock()
+
+
+def limitador_para(clave_api, tasa=0.5, capacidad=4):
+    """Cubo compartido por todo el proceso para una API key (todas las partidas consumen del mismo cupo)"""
+    clave = hashlib.sha256((clave_api or "").encode("utf-8")).hexdigest()
+    with _lock_limitadores:
+        if clave not in _limitadores:
+            _limitadores[clave] = CuboTokens(tasa, capacidad)
+        return _limitadores[clave]
@@ -0,0 +1,76 @@
+import time
+from collections import deque
+from enum import Enum
+
+
+class Fase(str, Enum):
+    """Fases de la partida. Hereda de str: `Fase.JUGANDO == "jugando"` y sirve como clave de dict"""
+    INICIO = "inicio"
+    REGISTRO = "registro"
+    MOSTRANDO_PALABRAS = "mostrando_palabras"
+    JUGANDO = "jugando"
+    DECISION_RONDA = "decision_ronda"
+    VOTACION = "votacion"
+    PREGUNTA_FINAL = "pregunta_final"
+    RESULTADO = "resultado"
+
+    def __str__(self):
+        return self.value
+
+    __hash__ = str.__hash__
+
+
+CUALQUIER_FASE = None
+
+
+class Transicion:
+    """Una fila de la tabla: si `guarda` lo permite, ejecuta `accion` y pasa a `destino`"""
+
+    __slots__ = ("accion", "destino", "guarda")
+
+    def __init__(self, accion, destino=None, guarda=None):
+        self.accion = accion    # callable(slots, texto) -> respuesta o None
+        self.destino = destino  # Fase, o None para quedarse donde está
+        self.guarda = guarda    # callable(slots, texto) -> bool, o None
+
+
+class MaquinaEstados:
+    """Flujo del juego como tabla (fase, evento) -> transiciones, con registro de eventos.
+
+    Cada turno es una búsqueda en un dict; si hay varias transiciones para la misma
+    clave se prueba la primera cuya guarda pasa. Las filas con fase CUALQUIER_FASE valen
+    para todas. `eventos` guarda las últimas transiciones para reproducir o medir partidas.
+    """
+
+    def __init__(self, fase_inicial=Fase.INICIO, max_eventos=2000):
+        self.fase = Fase(fase_inicial)
+        self.tabla = {}
+        self.eventos = deque(maxlen=max_eventos)
+
+    def agregar(self, fase, evento, accion, destino=None, guarda=None):
+        self.tabla.setdefault((fase, evento), []).append(Transicion(accion, destino, guarda))
+        return self
+
+    def _registrar(self, origen, evento, destino):
+        self.eventos.append((time.monotonic(), origen.value, evento, destino.value))
+
+    def despachar(self, evento, slots=None, texto=""):
+        """Ejecuta la transición de (fase actual, evento). None si no hay ninguna aplicable"""
+        slots = slots or {}
+        transiciones = self.tabla.get((self.fase, evento)) or self.tabla.get((CUALQUIER_FASE, evento))
+        if not transiciones:
+            return None
+
+        for t in transiciones:
+            if t.guarda is None or t.guarda(slots, texto):
+                origen = self.fase
+                respuesta = t.accion(slots, texto)
+                if t.destino is not None:
+                    self.fase = t.destino
+                self._registrar(origen, evento, self.fase)
+                return respuesta
+        return None
+
+    def historial(self):
+        """Copia de los eventos: (instante, fase_origen, evento, fase_destino)"""
+        return list(self.eventos)
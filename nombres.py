@@ -0,0 +1,124 @@
+import re
+import threading
+
+from intenciones import plegar
+
+# Palabras que nunca son un nombre aunque se parezcan a uno ("por" ~ "Pol")
+_PALABRAS_VACIAS = {
+    "voto", "votar", "por", "para", "que", "creo", "es", "el", "la", "los", "las",
+    "yo", "mi", "a", "al", "de", "del", "impostor", "pienso", "digo", "seguro", "sin", "duda"
+}
+
+_REGLAS_FONETICAS = [
+    (re.compile(r"[^a-zñ]"), ""),
+    (re.compile(r"ch"), "X"),
+    (re.compile(r"ll|y(?=[aeiou])"), "Y"),
+    # "gu" ante e/i es g dura (Miguel, Guido): marcador "G" para que la regla de g suave no la toque
+    (re.compile(r"qu(?=[ei])|gu(?=[ei])"), lambda m: "k" if m.group(0)[0] == "q" else "G"),
+    (re.compile(r"c(?=[ei])|z"), "s"),
+    (re.compile(r"g(?=[ei])"), "j"),
+    (re.compile(r"G"), "g"),
+    (re.compile(r"c|q"), "k"),
+    (re.compile(r"^x"), "j"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"v|w"), "b"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"ñ"), "n"),
+    (re.compile(r"y$"), "i"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+
+def clave_fonetica(texto):
+    """Clave fonética para español: agrupa lo que suena igual ('Karlos' / 'Carlos', 'Baleria' / 'Valeria')"""
+    clave = plegar(texto)
+    for patron, reemplazo in _REGLAS_FONETICAS:
+        clave = patron.sub(reemplazo, clave)
+    return clave
+
+
+def distancia_acotada(a, b, limite):
+    """Levenshtein que abandona en cuanto se supera `limite`; devuelve limite + 1 en ese caso"""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    previa = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb)))
+        if min(actual) > limite:
+            return limite + 1
+        previa = actual
+    return previa[-1]
+
+
+class IndiceNombres:
+    """Resuelve una transcripción de Vosk al jugador que más se le parece, con una confianza de 0 a 1.
+
+    Se alimenta con `agregar` en la fase de registro; cada nombre se indexa por su forma
+    plegada y por su clave fonética, y lo que no coincide exactamente se compara con una
+    distancia de edición acotada.
+    """
+
+    def __init__(self, umbral=0.7):
+        self.umbral = umbral
+        self._por_forma = {}     # "jose" -> "José"
+        self._por_clave = {}     # "jose" -> ["José"]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._por_forma)
+
+    def agregar(self, nombre):
+        forma = plegar(nombre)
+        with self._lock:
+            if forma in self._por_forma:
+                return
+            self._por_forma[forma] = nombre
+            self._por_clave.setdefault(clave_fonetica(nombre), []).append(nombre)
+
+    def sincronizar(self, jugadores):
+        """Añade los que falten (p.ej. registrados por un comando de la IA)"""
+        if len(jugadores) != len(self._por_forma):
+            for nombre in jugadores:
+                self.agregar(nombre)
+
+    def _candidatos(self, texto):
+        # Palabras sueltas y parejas de palabras, por si el nombre tiene dos partes
+        palabras = re.findall(r"[a-zñ]+", plegar(texto))
+        for i, palabra in enumerate(palabras):
+            if palabra not in _PALABRAS_VACIAS and len(palabra) > 1:
+                yield palabra
+            if i + 1 < len(palabras):
+                yield f"{palabra} {palabras[i + 1]}"
+
+    def resolver(self, texto):
+        """(jugador, confianza) del mejor parecido en el texto, o (None, 0.0) si ninguno llega al umbral"""
+        mejor, confianza = None, 0.0
+        with self._lock:
+            if not self._por_forma:
+                return None, 0.0
+            for candidato in self._candidatos(texto):
+                exacto = self._por_forma.get(candidato)
+                if exacto:
+                    return exacto, 1.0
+
+                clave = clave_fonetica(candidato)
+                iguales = self._por_clave.get(clave)
+                if iguales and len(iguales) == 1 and confianza < 0.9:
+                    mejor, confianza = iguales[0], 0.9
+                    continue
+
+                limite = max(1, len(clave) // 4)
+                for clave_jugador, nombres in self._por_clave.items():
+                    if len(nombres) != 1:
+                        continue  # dos jugadores que suenan igual: no adivinar
+                    d = distancia_acotada(clave, clave_jugador, limite)
+                    if d <= limite:
+                        puntuacion = 0.85 * (1 - d / max(len(clave), len(clave_jugador)))
+                        if puntuacion > confianza:
+                            mejor, confianza = nombres[0], puntuacion
+
+        if confianza < self.umbral:
+            return None, confianza
+        return mejor, confianza
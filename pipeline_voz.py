@@ -0,0 +1,115 @@
+import queue
+import re
+import threading
+
+# Fin de frase: puntuación final (con comillas/paréntesis de cierre) seguida de espacio, o salto de línea
+_FIN_FRASE = re.compile(r'[.!?…]+["\'»”)]*(?=\s)|\n+')
+_NUMERO_LISTA = re.compile(r'(?:^|\s)\d{1,2}$')
+
+
+class DivisorFrases:
+    """Parte texto que llega por fragmentos en frases completas"""
+
+    def __init__(self, min_caracteres=12):
+        self.min_caracteres = min_caracteres  # frases más cortas se juntan con la siguiente
+        self.pendiente = ""
+
+    def agregar(self, fragmento):
+        """Añade texto y devuelve las frases que ya están cerradas"""
+        self.pendiente += fragmento
+        frases = []
+        inicio = 0
+        for m in _FIN_FRASE.finditer(self.pendiente):
+            if m.group().startswith(".") and _NUMERO_LISTA.search(self.pendiente, inicio, m.start()):
+                continue  # "1. ¿Te gusta?" es un ítem de lista, no un final de frase
+            frase = self.pendiente[inicio:m.end()].strip()
+            if len(frase) < self.min_caracteres:
+                continue
+            frases.append(frase)
+            inicio = m.end()
+        self.pendiente = self.pendiente[inicio:]
+        return frases
+
+    def vaciar(self):
+        """Devuelve lo que quede al terminar el texto"""
+        resto = self.pendiente.strip()
+        self.pendiente = ""
+        return [resto] if resto else []
+
+    def frases(self, fragmentos):
+        """Generador de frases a partir de un iterable de fragmentos de texto"""
+        for fragmento in fragmentos:
+            yield from self.agregar(fragmento)
+        yield from self.vaciar()
+
+
+class PipelineVoz:
+    """Texto → síntesis → reproducción por frases.
+
+    Mientras suena la frase N ya se está sintetizando la N+1 (y el LLM sigue
+    generando), así que las latencias de las tres etapas se solapan en vez de sumarse.
+    """
+
+    def __init__(self, sintetizar, reproducir, limpiar=None, adelanto=2):
+        self.sintetizar = sintetizar  # sintetizar(frase) -> iterable de bytes; la síntesis arranca al llamarla
+        self.reproducir = reproducir  # reproducir(audio) bloquea hasta terminar; False si se interrumpió
+        self.limpiar = limpiar or (lambda frase: frase)
+        self.adelanto = adelanto      # frases sintetizándose por delante de la que suena
+
+    def hablar(self, fragmentos, al_frase=None):
+        """Habla el texto que va llegando en `fragmentos`.
+
+        al_frase(frase, hablada) recibe todas las frases de la respuesta: justo antes de que
+        suene (hablada=True) o, tras una interrupción o un fallo del TTS, sin audio (hablada=False),
+        para que el texto completo llegue siempre a pantalla.
+        """
+        cola = queue.Queue(maxsize=self.adelanto)
+        callado = threading.Event()  # interrumpido o sin TTS: el resto de frases solo se muestra
+
+        def productor():
+            try:
+                for frase in DivisorFrases().frases(fragmentos):
+                    frase = self.limpiar(frase)
+                    if frase:
+                        # Ya no va a sonar: no pedir más audio al TTS
+                        audio = None if callado.is_set() else self.sintetizar(frase)
+                        cola.put((frase, audio))
+            except Exception as e:
+                cola.put(e)
+            finally:
+                cola.put(None)
+
+        threading.Thread(target=productor, daemon=True).start()
+
+        dichas = []
+        error = None
+        try:
+            for item in iter(cola.get, None):
+                if isinstance(item, Exception):
+                    error = error or item
+                    continue
+                frase, audio = item
+                if callado.is_set():
+                    if al_frase:
+                        al_frase(frase, False)
+                    continue
+                if al_frase:
+                    al_frase(frase, True)
+                try:
+                    sono = self.reproducir(audio)
+                except Exception as e:
+                    error = e
+                    callado.set()
+                    continue
+                if sono is False:
+                    callado.set()
+                    continue
+                dichas.append(frase)
+        except Exception:
+            # Dejar que el productor termine: el motor solo aplica el estado al agotar su respuesta
+            while cola.get() is not None:
+                pass
+            raise
+        if error:
+            raise error
+        return " ".join(dichas)
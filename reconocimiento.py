@@ -0,0 +1,400 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from bitacora import registro
+
+log = registro("vosk")
+
+
+class GestorModeloVosk:
+    """Carga el modelo Vosk una sola vez por proceso, en segundo plano, y presta reconocedores.
+
+    Los reconocedores se reutilizan entre locuciones y entre partidas; al devolverlos
+    se reinician para que el estado de una locución no contamine la siguiente. Cada uno
+    recuerda su gramática (ver gramaticas.py) para no recompilarla si no cambió la fase.
+    """
+
+    _compartidos = {}
+    _lock_compartidos = threading.Lock()
+
+    @classmethod
+    def compartido(cls, ruta="model", frecuencia=16000, tam_pool=4):
+        """Devuelve el gestor único para (ruta, frecuencia) en este proceso"""
+        clave = (os.path.abspath(ruta), frecuencia)
+        with cls._lock_compartidos:
+            if clave not in cls._compartidos:
+                cls._compartidos[clave] = cls(ruta, frecuencia, tam_pool)
+            return cls._compartidos[clave]
+
+    def __init__(self, ruta="model", frecuencia=16000, tam_pool=4):
+        self.ruta = ruta
+        self.frecuencia = frecuencia
+        self.tam_pool = tam_pool  # máximo de reconocedores vivos a la vez
+        self.modelo = None
+        self.error = None
+        self.listo = threading.Event()
+        self._hilo = None
+        self._cond = threading.Condition()
+        self._libres = []
+        self._creados = 0
+        self._gramaticas = {}  # id(reconocedor) -> gramática JSON con la que está configurado
+        self._vocabulario = {}  # palabra -> está en el vocabulario del modelo
+
+    @property
+    def disponible(self):
+        return self.listo.is_set() and self.modelo is not None
+
+    @property
+    def fallo(self):
+        return self.listo.is_set() and self.modelo is None
+
+    def cargar_en_segundo_plano(self, al_progreso=None, tam_precalentar=1):
+        """Empieza a cargar el modelo sin bloquear. al_progreso(estado, segundos) se llama desde otro hilo"""
+        with self._cond:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._cargar, args=(tam_precalentar,), daemon=True)
+                self._hilo.start()
+
+        if al_progreso:
+            threading.Thread(target=self._informar_progreso, args=(al_progreso,), daemon=True).start()
+
+    def _cargar(self, tam_precalentar):
+        log.info("Cargando VOSK...")
+        try:
+            if not os.path.exists(self.ruta):
+                raise FileNotFoundError(f"No se encuentra la carpeta '{self.ruta}'.")
+            from vosk import Model
+            self.modelo = Model(self.ruta)
+            # Dejar reconocedores listos para que la primera locución no pague su creación
+            with self._cond:
+                for _ in range(min(tam_precalentar, self.tam_pool)):
+                    self._libres.append(self._crear_reconocedor())
+        except Exception as e:
+            log.error("Error VOSK: %s", e)
+            self.error = e
+            self.modelo = None
+        finally:
+            self.listo.set()
+            with self._cond:
+                self._cond.notify_all()
+
+    def _informar_progreso(self, al_progreso):
+        inicio = time.perf_counter()
+        while not self.listo.wait(0.5):
+            al_progreso("cargando", time.perf_counter() - inicio)
+        al_progreso("listo" if self.modelo is not None else "error", time.perf_counter() - inicio)
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que termine la carga. Devuelve True si el modelo está disponible"""
+        self.listo.wait(timeout)
+        return self.disponible
+
+    def en_vocabulario(self, palabra):
+        """True si el modelo conoce la palabra (Vosk ignora en las gramáticas las que no conoce)"""
+        if self.modelo is None:
+            return True  # sin modelo no se usa ninguna gramática
+        conocida = self._vocabulario.get(palabra)
+        if conocida is None:
+            conocida = self.modelo.find_word(palabra) >= 0
+            self._vocabulario[palabra] = conocida
+        return conocida
+
+    def _crear_reconocedor(self, gramatica=None):
+        from vosk import KaldiRecognizer
+        self._creados += 1
+        if gramatica is None:
+            reconocedor = KaldiRecognizer(self.modelo, self.frecuencia)
+        else:
+            reconocedor = KaldiRecognizer(self.modelo, self.frecuencia, gramatica)
+        self._gramaticas[id(reconocedor)] = gramatica
+        return reconocedor
+
+    def _descartar(self, reconocedor):
+        # Llamar con self._cond tomado
+        self._gramaticas.pop(id(reconocedor), None)
+        self._creados -= 1
+        self._cond.notify()
+
+    def _configurar(self, reconocedor, gramatica):
+        """Deja el reconocedor con la gramática pedida (None = vocabulario abierto)"""
+        if self._gramaticas.get(id(reconocedor)) == gramatica:
+            return reconocedor
+
+        if gramatica is not None and hasattr(reconocedor, "SetGrammar"):
+            try:
+                reconocedor.SetGrammar(gramatica)
+                with self._cond:
+                    self._gramaticas[id(reconocedor)] = gramatica
+                return reconocedor
+            except Exception as e:
+                log.warning("Error aplicando gramática VOSK: %s", e)
+
+        # Vosk no permite quitar una gramática: se cambia por uno nuevo
+        with self._cond:
+            self._descartar(reconocedor)
+            return self._crear_reconocedor(gramatica)
+
+    def adquirir(self, timeout=None, gramatica=None):
+        """Presta un reconocedor limpio con la gramática pedida; espera a la carga o a que se libere uno"""
+        if not self.esperar(timeout):
+            raise RuntimeError("Modelo VOSK no disponible")
+
+        with self._cond:
+            while not self._libres and self._creados >= self.tam_pool:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("No hay reconocedores VOSK libres")
+            if not self._libres:
+                return self._crear_reconocedor(gramatica)
+            # Preferir uno que ya tenga esta gramática
+            for i in range(len(self._libres) - 1, -1, -1):
+                if self._gramaticas.get(id(self._libres[i])) == gramatica:
+                    return self._libres.pop(i)
+            reconocedor = self._libres.pop()
+
+        return self._configurar(reconocedor, gramatica)
+
+    def liberar(self, reconocedor):
+        """Reinicia el reconocedor y lo devuelve al pool"""
+        try:
+            if hasattr(reconocedor, "Reset"):
+                reconocedor.Reset()
+            else:
+                reconocedor.FinalResult()
+        except Exception as e:
+            # Si no se puede limpiar, mejor descartarlo que contaminar la siguiente locución
+            log.warning("Error reiniciando reconocedor VOSK: %s", e)
+            with self._cond:
+                self._descartar(reconocedor)
+            return
+
+        with self._cond:
+            self._libres.append(reconocedor)
+            self._cond.notify()
+
+    @contextmanager
+    def prestar(self, timeout=None, gramatica=None):
+        reconocedor = self.adquirir(timeout, gramatica)
+        try:
+            yield reconocedor
+        finally:
+            self.liberar(reconocedor)
+
+
+def limpiar_desconocidas(texto):
+    """Quita los [unk] que Vosk emite cuando hay gramática y lo dicho no encaja en ella"""
+    if "[unk]" not in texto:
+        return texto
+    return " ".join(p for p in texto.split() if p != "[unk]")
+
+
+class _LocucionVosk:
+    """Acumula segmentos y parciales de Vosk para una locución con un reconocedor prestado"""
+
+    def __init__(self, gestor, al_parcial=None):
+        self.gestor = gestor  # GestorModeloVosk
+        self.al_parcial = al_parcial  # callback(texto_parcial), se llama desde el hilo worker
+        self.gramatica = None  # gramática JSON de la fase; se aplica al empezar cada locución
+        self.reconocedor = None
+        self.segmentos = []
+        self.ultimo_parcial = ""
+
+    def _nueva_locucion(self):
+        if self.reconocedor is None:
+            self.reconocedor = self.gestor.adquirir(gramatica=self.gramatica)
+        self.segmentos = []
+        self.ultimo_parcial = ""
+
+    def _abortar_locucion(self):
+        if self.reconocedor is not None:
+            self.gestor.liberar(self.reconocedor)
+            self.reconocedor = None
+
+    def _aceptar(self, datos):
+        if self.reconocedor.AcceptWaveform(datos):
+            # Vosk cerró un segmento: guardarlo y seguir
+            texto = limpiar_desconocidas(json.loads(self.reconocedor.Result()).get("text", ""))
+            if texto:
+                self.segmentos.append(texto)
+            self.ultimo_parcial = ""
+        else:
+            parcial = limpiar_desconocidas(json.loads(self.reconocedor.PartialResult()).get("partial", ""))
+            if parcial and parcial != self.ultimo_parcial:
+                self.ultimo_parcial = parcial
+                if self.al_parcial:
+                    self.al_parcial(" ".join(self.segmentos + [parcial]))
+
+    def _cerrar_locucion(self):
+        try:
+            texto = limpiar_desconocidas(json.loads(self.reconocedor.FinalResult()).get("text", ""))
+            if texto:
+                self.segmentos.append(texto)
+        finally:
+            self._abortar_locucion()
+        return " ".join(self.segmentos).strip()
+
+
+class ReconocedorStreaming(_LocucionVosk):
+    """Alimenta a Vosk desde el buffer circular de captura mientras el botón está presionado"""
+
+    def __init__(self, gestor, anillo, al_parcial=None):
+        super().__init__(gestor, al_parcial)
+        self.anillo = anillo  # BufferCircular compartido con el callback de audio
+        self.hay_datos = threading.Event()
+        self.cerrando = False
+        self.hilo = None
+        self.texto_final = ""
+        self.terminado = threading.Event()
+        self.terminado.set()
+
+    def iniciar(self):
+        """Arranca el hilo worker para una nueva locución (el modelo ya debe estar cargado)"""
+        self._nueva_locucion()
+        self.texto_final = ""
+        self.cerrando = False
+        self.hay_datos.clear()
+        self.terminado.clear()
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+
+    def alimentar(self):
+        """Avisa de que hay audio nuevo en el anillo. No asigna memoria: seguro desde el callback"""
+        self.hay_datos.set()
+
+    def finalizar(self, timeout=None):
+        """Cierra la locución y devuelve la transcripción completa"""
+        self.cerrando = True
+        self.hay_datos.set()
+        self.terminado.wait(timeout)
+        return self.texto_final
+
+    def _bucle(self):
+        try:
+            while True:
+                self.hay_datos.wait()
+                self.hay_datos.clear()
+                cerrando = self.cerrando
+
+                for vista in self.anillo.vistas():
+                    # El binding de Vosk solo acepta bytes; la copia ocurre aquí, fuera del hilo de audio
+                    self._aceptar(vista.tobytes())
+                    self.anillo.consumir(len(vista))
+
+                if cerrando:
+                    break
+
+            self.texto_final = self._cerrar_locucion()
+
+        except Exception as e:
+            log.error("Error VOSK streaming: %s", e)
+            self._abortar_locucion()
+        finally:
+            self.terminado.set()
+
+
+class EscuchaContinua(_LocucionVosk):
+    """Modo manos libres: el VAD decide qué tramas llegan a Vosk y cierra el turno al detectar silencio"""
+
+    def __init__(self, gestor, anillo, detector, al_final, al_parcial=None, ms_preroll=300):
+        super().__init__(gestor, al_parcial)
+        self.anillo = anillo  # BufferCircular continuo (sin límite total)
+        self.detector = detector  # vad.DetectorVoz
+        self.al_final = al_final  # callback(texto), se llama desde el hilo worker al cerrar cada locución
+        self.preroll = deque(maxlen=max(1, ms_preroll // detector.ms_trama))
+        self.hay_datos = threading.Event()
+        self.activo = False
+        self.pausado = False
+        self.hilo = None
+
+    def iniciar(self):
+        self.activo = True
+        self.pausado = False
+        self.hay_datos.clear()
+        self.hilo = threading.Thread(target=self._bucle, daemon=True)
+        self.hilo.start()
+
+    def detener(self):
+        self.activo = False
+        self.hay_datos.set()
+        if self.hilo:
+            self.hilo.join(timeout=1.0)
+            self.hilo = None
+
+    def alimentar(self):
+        """Avisa de que hay audio nuevo en el anillo. Seguro desde el callback de audio"""
+        self.hay_datos.set()
+
+    def pausar(self):
+        """Ignora el micrófono (p. ej. mientras Jarvis habla) sin cerrar el stream"""
+        self.pausado = True
+
+    def reanudar(self):
+        self.pausado = False
+
+    def _bucle(self):
+        muestras_trama = self.detector.muestras_trama
+        pendiente = np.zeros(0, dtype=np.int16)
+        en_locucion = False
+
+        while self.activo:
+            self.hay_datos.wait(0.5)
+            self.hay_datos.clear()
+
+            vistas = self.anillo.vistas()
+            n = sum(len(v) for v in vistas)
+            if not n:
+                continue
+            audio = np.concatenate((pendiente, *vistas))
+            self.anillo.consumir(n)
+
+            try:
+                if self.pausado:
+                    if en_locucion:
+                        self._abortar_locucion()
+                        en_locucion = False
+                    self.detector.reiniciar()
+                    self.preroll.clear()
+                    pendiente = pendiente[:0]
+                    continue
+
+                completas = len(audio) // muestras_trama * muestras_trama
+                pendiente = audio[completas:]
+                voz = []
+
+                for i in range(0, completas, muestras_trama):
+                    trama = audio[i:i + muestras_trama]
+                    evento = self.detector.procesar(trama)
+
+                    if evento == "inicio":
+                        en_locucion = True
+                        self._nueva_locucion()
+                        voz.extend(self.preroll)
+                        self.preroll.clear()
+                        voz.append(trama)
+                    elif en_locucion:
+                        voz.append(trama)
+                        if evento == "fin":
+                            self._aceptar(b"".join(t.tobytes() for t in voz))
+                            voz = []
+                            en_locucion = False
+                            texto = self._cerrar_locucion()
+                            if texto:
+                                self.al_final(texto)
+                    else:
+                        # El silencio nunca llega a Vosk; solo guardamos un poco para no cortar el arranque
+                        self.preroll.append(trama)
+
+                if voz:
+                    self._aceptar(b"".join(t.tobytes() for t in voz))
+
+            except Exception as e:
+                log.error("Error VOSK manos libres: %s", e)
+                self._abortar_locucion()
+                en_locucion = False
+
+        self._abortar_locucion()
@@ -0,0 +1,205 @@
+import io
+import threading
+import time
+
+import pygame
+
+# Tablas de cabecera MP3 (solo Layer III, que es lo que entrega edge-tts)
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_FRECUENCIAS = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def longitud_trama_mp3(cabecera):
+    """Bytes de la trama MP3 que empieza con estos 4 bytes, o None si no es una cabecera válida"""
+    if len(cabecera) < 4 or cabecera[0] != 0xFF or (cabecera[1] & 0xE0) != 0xE0:
+        return None
+    version = (cabecera[1] >> 3) & 3
+    capa = (cabecera[1] >> 1) & 3
+    indice_bitrate = cabecera[2] >> 4
+    indice_frecuencia = (cabecera[2] >> 2) & 3
+    if version == 1 or capa != 1 or indice_bitrate in (0, 15) or indice_frecuencia == 3:
+        return None
+
+    relleno = (cabecera[2] >> 1) & 1
+    frecuencia = _FRECUENCIAS[version][indice_frecuencia]
+    if version == 3:
+        return 144 * _BITRATES_MPEG1[indice_bitrate] * 1000 // frecuencia + relleno
+    return 72 * _BITRATES_MPEG2[indice_bitrate] * 1000 // frecuencia + relleno
+
+
+class SegmentadorMP3:
+    """Corta un flujo MP3 en bloques de tramas completas que se pueden decodificar por separado.
+
+    El primer bloque sale con las tramas completas del primer fragmento para arrancar cuanto
+    antes; los siguientes crecen desde `min_tramas` hasta `max_tramas` para que haya pocas
+    costuras entre bloques (cada costura pierde el bit reservoir de una trama).
+    """
+
+    def __init__(self, min_tramas=8, max_tramas=64):
+        self.pendiente = bytearray()
+        self.tramas_objetivo = min_tramas
+        self.max_tramas = max_tramas
+        self.id3_revisado = False
+        self.arrancado = False
+
+    def _saltar_id3(self):
+        if len(self.pendiente) < 10:
+            return False
+        if self.pendiente[:3] == b"ID3":
+            tam = 0
+            for b in self.pendiente[6:10]:
+                tam = (tam << 7) | (b & 0x7F)
+            if len(self.pendiente) < 10 + tam:
+                return False
+            del self.pendiente[:10 + tam]
+        self.id3_revisado = True
+        return True
+
+    def agregar(self, fragmento):
+        """Añade bytes recibidos y devuelve la lista de bloques listos para reproducir"""
+        self.pendiente += fragmento
+        if not self.id3_revisado and not self._saltar_id3():
+            return []
+
+        bloques = []
+        pos = 0
+        inicio = 0
+        tramas = 0
+        while pos + 4 <= len(self.pendiente):
+            largo = longitud_trama_mp3(self.pendiente[pos:pos + 4])
+            if largo is None:
+                # Basura entre tramas: resincronizar
+                pos += 1
+                continue
+            if pos + largo > len(self.pendiente):
+                break
+            pos += largo
+            tramas += 1
+            if tramas >= self.tramas_objetivo:
+                bloques.append(bytes(self.pendiente[inicio:pos]))
+                inicio = pos
+                tramas = 0
+                self.tramas_objetivo = min(self.tramas_objetivo * 2, self.max_tramas)
+
+        if tramas and not bloques and not self.arrancado:
+            # Primer sonido: no esperar a juntar un bloque completo
+            bloques.append(bytes(self.pendiente[inicio:pos]))
+            inicio = pos
+        if bloques:
+            self.arrancado = True
+        del self.pendiente[:inicio]
+        return bloques
+
+    def vaciar(self):
+        """Devuelve lo que quede al terminar el flujo"""
+        resto = bytes(self.pendiente)
+        self.pendiente = bytearray()
+        return [resto] if resto else []
+
+
+class ReproductorAudio:
+    """Reproduce MP3 desde memoria en un canal de pygame propio, sin archivos temporales ni sondeo.
+
+    Cada instancia reserva su propio canal, así que varias sesiones pueden hablar a la vez.
+    El final se espera con un Event (que `detener` despierta), no con un bucle get_busy().
+    """
+
+    _canales_asignados = 0
+    _lock_canales = threading.Lock()
+
+    def __init__(self):
+        self.canal = None
+        self._interrumpir = threading.Event()
+        self.terminado = threading.Event()  # puesto mientras no suena nada
+        self.terminado.set()
+
+    @classmethod
+    def _reservar_canal(cls):
+        with cls._lock_canales:
+            indice = cls._canales_asignados
+            cls._canales_asignados += 1
+            if pygame.mixer.get_num_channels() <= indice:
+                pygame.mixer.set_num_channels(indice + 1)
+            # Los canales reservados no los usa Sound.play() para otros sonidos
+            pygame.mixer.set_reserved(cls._canales_asignados)
+            return pygame.mixer.Channel(indice)
+
+    def _canal(self):
+        if self.canal is None:
+            self.canal = self._reservar_canal()
+        return self.canal
+
+    def detener(self):
+        """Corta lo que esté sonando; las siguientes reproducciones se ignoran hasta rearmar()"""
+        self._interrumpir.set()
+        if self.canal is not None:
+            self.canal.stop()
+
+    def rearmar(self):
+        self._interrumpir.clear()
+
+    @property
+    def interrumpido(self):
+        return self._interrumpir.is_set()
+
+    def reproducir(self, audio, al_terminar=None):
+        """Reproduce bytes MP3 completos o un iterable de fragmentos MP3 según llegan.
+
+        Bloquea hasta el final. Devuelve False (y llama al_terminar(False)) si se interrumpió.
+        """
+        if self._interrumpir.is_set():
+            completo = False
+        else:
+            self.terminado.clear()
+            try:
+                if isinstance(audio, (bytes, bytearray, memoryview)):
+                    completo = self._reproducir_bytes(bytes(audio))
+                else:
+                    completo = self._reproducir_stream(audio)
+            finally:
+                self.terminado.set()
+
+        if al_terminar:
+            al_terminar(completo)
+        return completo
+
+    def _reproducir_bytes(self, datos):
+        # Audio completo (p. ej. del cache): un solo Sound, sin costuras
+        canal = self._canal()
+        sonido = pygame.mixer.Sound(file=io.BytesIO(datos))
+        canal.play(sonido)
+        return not self._interrumpir.wait(sonido.get_length())
+
+    def _reproducir_stream(self, fragmentos):
+        canal = self._canal()
+        segmentador = SegmentadorMP3()
+        fin_previsto = time.monotonic()
+
+        def encolar(bloque):
+            nonlocal fin_previsto
+            sonido = pygame.mixer.Sound(file=io.BytesIO(bloque))
+            ahora = time.monotonic()
+            if ahora >= fin_previsto:
+                canal.play(sonido)
+                fin_previsto = ahora + sonido.get_length()
+                return True
+            # Sin hueco: el canal lo arranca justo al terminar el bloque actual
+            canal.queue(sonido)
+            fin_previsto += sonido.get_length()
+            # Solo cabe un bloque en cola: esperar a que empiece a sonar antes de aceptar otro
+            return not self._interrumpir.wait(max(0.0, fin_previsto - sonido.get_length() - time.monotonic()))
+
+        for fragmento in fragmentos:
+            for bloque in segmentador.agregar(fragmento):
+                if not encolar(bloque):
+                    return False
+            if self._interrumpir.is_set():
+                return False
+        for bloque in segmentador.vaciar():
+            try:
+                encolar(bloque)
+            except pygame.error:
+                pass  # cola truncada sin tramas completas
+
+        return not self._interrumpir.wait(max(0.0, fin_previsto - time.monotonic()))
@@ -0,0 +1,194 @@
+# Servicios externos del juego (LLM, TTS, ASR) detrás de interfaces pequeñas.
+# Nada de aquí importa google-generativeai, edge_tts ni vosk al cargar el módulo: cada
+# implementación real lo hace la primera vez que se usa. Las versiones *Nulo no hacen
+# E/S y sirven para simular partidas, pruebas y modo sin red.
+import os
+import threading
+
+from historial_chat import HistorialChat
+from limitador import CuboTokens, limitador_para
+
+_entorno_cargado = False
+_lock_entorno = threading.Lock()
+
+
+def cargar_entorno():
+    """Lee el .env una sola vez, solo cuando algún servicio real lo necesita"""
+    global _entorno_cargado
+    with _lock_entorno:
+        if not _entorno_cargado:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _entorno_cargado = True
+
+
+# === LLM ===
+# crear_chat(instruccion, max_turnos) -> objeto con enviar, enviar_stream, reiniciar, tokens_aproximados
+# crear_generador(instruccion, max_tokens, temperatura) -> callable(prompt) -> texto
+# limitador -> CuboTokens que regula las peticiones
+
+class LLMGemini:
+    """Gemini vía google-generativeai; el SDK se importa y configura en la primera petición"""
+
+    _lock_sdk = threading.Lock()
+
+    def __init__(self, clave_api=None, modelo="gemini-2.5-flash", modelo_ligero="gemini-2.5-flash-lite"):
+        if clave_api is None:
+            cargar_entorno()
+            clave_api = os.environ.get("GOOGLE_API_KEY")
+        self.clave_api = clave_api
+        self.modelo = modelo
+        self.modelo_ligero = modelo_ligero
+        # Cubo compartido por todas las partidas que usan la misma API key
+        self.limitador = limitador_para(clave_api)
+        self._genai = None
+
+    def _sdk(self):
+        with self._lock_sdk:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self.clave_api)
+                self._genai = genai
+            return self._genai
+
+    def crear_chat(self, instruccion, max_turnos=8):
+        return _ChatPerezoso(self, instruccion, max_turnos)
+
+    def crear_generador(self, instruccion, max_tokens=40, temperatura=0.9):
+        modelo = []
+
+        def generar(prompt):
+            if not modelo:
+                genai = self._sdk()
+                modelo.append(genai.GenerativeModel(
+                    model_name=self.modelo_ligero,
+                    system_instruction=instruccion,
+                    generation_config=genai.GenerationConfig(
+                        max_output_tokens=max_tokens,
+                        temperature=temperatura
+                    )
+                ))
+            return modelo[0].generate_content(prompt).text
+        return generar
+
+
+class _ChatPerezoso:
+    """HistorialChat que no crea el modelo de Gemini hasta la primera pregunta"""
+
+    def __init__(self, llm, instruccion, max_turnos):
+        self._llm = llm
+        self._instruccion = instruccion
+        self._max_turnos = max_turnos
+        self._historial = None
+        self._lock = threading.Lock()
+
+    def _real(self):
+        with self._lock:
+            if self._historial is None:
+                genai = self._llm._sdk()
+                modelo = genai.GenerativeModel(model_name=self._llm.modelo, system_instruction=self._instruccion)
+                self._historial = HistorialChat(modelo, self._max_turnos)
+            return self._historial
+
+    def enviar(self, prompt):
+        return self._real().enviar(prompt)
+
+    def enviar_stream(self, prompt):
+        return self._real().enviar_stream(prompt)
+
+    def reiniciar(self):
+        if self._historial is not None:
+            self._historial.reiniciar()
+
+    def tokens_aproximados(self):
+        return self._historial.tokens_aproximados() if self._historial is not None else 0
+
+
+class ChatNulo:
+    """Chat sin red: responde siempre lo mismo"""
+
+    def __init__(self, respuesta="Continúa."):
+        self.respuesta = respuesta
+
+    def enviar(self, prompt):
+        return self.respuesta
+
+    def enviar_stream(self, prompt):
+        yield self.respuesta
+
+    def reiniciar(self):
+        pass
+
+    def tokens_aproximados(self):
+        return 0
+
+
+class LLMNulo:
+    """LLM de mentira para simulaciones: respuestas fijas y sin límite de peticiones"""
+
+    def __init__(self, respuesta="Continúa.", comentario="Interesante perspectiva."):
+        self.respuesta = respuesta
+        self.comentario = comentario
+        self.limitador = CuboTokens(tasa=1e9, capacidad=1e9)
+
+    def crear_chat(self, instruccion, max_turnos=8):
+        return ChatNulo(self.respuesta)
+
+    def crear_generador(self, instruccion, max_tokens=40, temperatura=0.9):
+        return lambda prompt: self.comentario
+
+
+# === TTS ===
+# async stream(texto, voz) -> fragmentos MP3 según llegan; sin_audio indica que no hay nada que reproducir
+
+class TTSEdge:
+    """Edge-TTS; el paquete se importa en la primera síntesis"""
+
+    sin_audio = False
+
+    async def stream(self, texto, voz):
+        import edge_tts
+        communicate = edge_tts.Communicate(texto, voz)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+class TTSNulo:
+    """Sin síntesis: la interfaz solo muestra el texto"""
+
+    sin_audio = True
+
+    async def stream(self, texto, voz):
+        return
+        yield
+
+
+# === ASR ===
+# Misma superficie que reconocimiento.GestorModeloVosk (que ya importa vosk de forma perezosa)
+
+class ASRNulo:
+    """Sin reconocimiento de voz: la interfaz se comporta como si el modelo no hubiera cargado"""
+
+    disponible = False
+    fallo = True
+    error = None
+
+    def cargar_en_segundo_plano(self, al_progreso=None, tam_precalentar=1):
+        if al_progreso:
+            al_progreso("error", 0.0)
+
+    def esperar(self, timeout=None):
+        return False
+
+    def en_vocabulario(self, palabra):
+        return True
+
+    def adquirir(self, timeout=None, gramatica=None):
+        raise RuntimeError("Reconocimiento de voz desactivado")
+
+    def liberar(self, reconocedor):
+        pass
+
+    def prestar(self, timeout=None, gramatica=None):
+        raise RuntimeError("Reconocimiento de voz desactivado")
@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from demo_mdi_ia import AsistenteImpostor
+from cache_respuestas import CacheRespuestas
+from cache_tts import CacheTTS
+from pipeline_voz import DivisorFrases
+from bitacora import configurar, registro
+
+log = registro("servidor")
+
+# Protocolo: una línea JSON por mensaje, en ambos sentidos.
+#   -> {"tipo": "crear_mesa"}                                <- {"tipo": "mesa", "mesa": id, "estado": {...}}
+#   -> {"tipo": "texto", "mesa": id, "texto": "...", "voz": bool}
+#   -> {"tipo": "audio", "mesa": id, "pcm": base64 int16 mono, "voz": bool}
+#        <- {"tipo": "transcripcion", "texto": ...}          (solo para audio)
+#        <- {"tipo": "fragmento", "texto": ...}              (según llega del motor/LLM)
+#        <- {"tipo": "voz", "frase": ..., "mp3": base64}     (si voz=true)
+#        <- {"tipo": "fin", "respuesta": ..., "estado": {...}}
+#   -> {"tipo": "estado", "mesa": id}                        <- {"tipo": "estado", "estado": {...}}
+#   -> {"tipo": "cerrar_mesa", "mesa": id}                   <- {"tipo": "cerrada", "mesa": id}
+# Los errores se responden como {"tipo": "error", "mensaje": ...}.
+
+_FIN = object()
+
+
+class Mesa:
+    """Una partida: su propio motor y un candado para que sus turnos no se mezclen"""
+
+    def __init__(self, id_mesa, asistente):
+        self.id = id_mesa
+        self.asistente = asistente
+        self.turno = asyncio.Lock()
+
+
+class ServidorMesas:
+    """Muchas mesas de El Impostor en un solo proceso.
+
+    Todas comparten el modelo Vosk y su pool de reconocedores, el cache de TTS, el cache
+    de respuestas y el servicio LLM (y con él su limitador de peticiones). Cada mesa solo
+    aporta su estado de juego y su historial de chat.
+    """
+
+    def __init__(self, llm=None, tts=None, gestor_vosk=None, cache_tts=None, cache_respuestas=None,
+                 voz_tts="es-EC-LuisNeural", hilos=8):
+        if llm is None:
+            from servicios import LLMGemini
+            llm = LLMGemini()
+        if tts is None:
+            from servicios import TTSEdge
+            tts = TTSEdge()
+        self.llm = llm
+        self.tts = tts
+        self.gestor_vosk = gestor_vosk  # None: las mesas solo aceptan texto
+        self.cache_tts = cache_tts if cache_tts is not None else CacheTTS("cache_tts")
+        self.cache_respuestas = cache_respuestas if cache_respuestas is not None else CacheRespuestas.compartido("cache_respuestas.json")
+        self.voz_tts = voz_tts
+        self.mesas = {}
+        self._ids = itertools.count(1)
+        # El motor y Vosk bloquean: corren aquí, fuera del event loop
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="mesa")
+        self._servidor = None
+
+    # === Ciclo de vida ===
+    async def iniciar(self, host="127.0.0.1", puerto=8765):
+        self._servidor = await asyncio.start_server(self._atender, host, puerto)
+        return self._servidor.sockets[0].getsockname()[:2]
+
+    async def detener(self):
+        if self._servidor:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        self._ejecutor.shutdown(wait=False)
+
+    def crear_mesa(self):
+        id_mesa = str(next(self._ids))
+        asistente = AsistenteImpostor(llm=self.llm, cache_respuestas=self.cache_respuestas)
+        self.mesas[id_mesa] = Mesa(id_mesa, asistente)
+        log.info("Mesa %s creada (%s activas)", id_mesa, len(self.mesas))
+        return self.mesas[id_mesa]
+
+    async def cerrar_mesa(self, id_mesa):
+        """Quita la mesa y libera su motor, esperando a que termine el turno en curso"""
+        mesa = self.mesas.pop(id_mesa, None)
+        if mesa is None:
+            return
+        async with mesa.turno:
+            mesa.asistente.cerrar()
+        log.info("Mesa %s cerrada (%s activas)", id_mesa, len(self.mesas))
+
+    # === Conexiones ===
+    async def _atender(self, lector, escritor):
+        async def enviar(mensaje):
+            escritor.write(json.dumps(mensaje, ensure_ascii=False).encode("utf-8") + b"\n")
+            await escritor.drain()
+
+        propias = set()  # mesas creadas por esta conexión: se cierran al desconectarse
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea:
+                    break
+                try:
+                    mensaje = json.loads(linea)
+                    await self._despachar(mensaje, enviar, propias)
+                except Exception as e:
+                    log.exception("Error: %s", e)
+                    await enviar({"tipo": "error", "mensaje": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            escritor.close()
+            for id_mesa in propias:
+                await self.cerrar_mesa(id_mesa)
+
+    async def _despachar(self, mensaje, enviar, propias):
+        tipo = mensaje.get("tipo")
+        if tipo == "crear_mesa":
+            mesa = self.crear_mesa()
+            propias.add(mesa.id)
+            await enviar({"tipo": "mesa", "mesa": mesa.id, "estado": mesa.asistente.obtener_estado().a_dict()})
+            return
+
+        mesa = self.mesas.get(str(mensaje.get("mesa")))
+        if mesa is None:
+            raise KeyError(f"Mesa desconocida: {mensaje.get('mesa')}")
+
+        if tipo == "texto":
+            async with mesa.turno:
+                await self._turno(mesa, mensaje.get("texto", ""), mensaje.get("voz", False), enviar)
+        elif tipo == "audio":
+            async with mesa.turno:
+                texto = await self._transcribir(mesa, base64.b64decode(mensaje["pcm"]))
+                await enviar({"tipo": "transcripcion", "texto": texto})
+                if len(texto) > 2:
+                    await self._turno(mesa, texto, mensaje.get("voz", False), enviar)
+        elif tipo == "estado":
+            await enviar({"tipo": "estado", "estado": mesa.asistente.obtener_estado().a_dict()})
+        elif tipo == "cerrar_mesa":
+            propias.discard(mesa.id)
+            await self.cerrar_mesa(mesa.id)
+            await enviar({"tipo": "cerrada", "mesa": mesa.id})
+        else:
+            raise ValueError(f"Tipo de mensaje desconocido: {tipo}")
+
+    # === Turnos ===
+    async def _turno(self, mesa, texto, con_voz, enviar):
+        """Corre el motor en un hilo y reenvía sus fragmentos (y el audio por frases) según salen"""
+        loop = asyncio.get_running_loop()
+        cola = asyncio.Queue()
+
+        def producir():
+            try:
+                for fragmento in mesa.asistente.procesar_entrada_stream(texto):
+                    loop.call_soon_threadsafe(cola.put_nowait, fragmento)
+            except Exception as e:
+                loop.call_soon_threadsafe(cola.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(cola.put_nowait, _FIN)
+
+        produccion = loop.run_in_executor(self._ejecutor, producir)
+        divisor = DivisorFrases()
+        partes = []
+        while True:
+            fragmento = await cola.get()
+            if fragmento is _FIN:
+                break
+            if isinstance(fragmento, Exception):
+                raise fragmento
+            partes.append(fragmento)
+            await enviar({"tipo": "fragmento", "texto": fragmento})
+            if con_voz:
+                for frase in divisor.agregar(fragmento):
+                    await self._enviar_voz(frase, enviar)
+        await produccion
+
+        if con_voz:
+            for frase in divisor.vaciar():
+                await self._enviar_voz(frase, enviar)
+        await enviar({
+            "tipo": "fin",
+            "respuesta": "".join(partes).strip(),
+            "estado": mesa.asistente.obtener_estado().a_dict()
+        })
+
+    async def _enviar_voz(self, frase, enviar):
+        frase = re.sub(r'\[.*?\]', '', frase).strip()
+        if not frase or self.tts.sin_audio:
+            return
+        datos = await asyncio.to_thread(self.cache_tts.obtener, self.voz_tts, frase)
+        if datos is None:
+            recibido = bytearray()
+            async for fragmento in self.tts.stream(frase, self.voz_tts):
+                recibido.extend(fragmento)
+            datos = bytes(recibido)
+            if datos:
+                await asyncio.to_thread(self.cache_tts.guardar, self.voz_tts, frase, datos)
+        if datos:
+            await enviar({"tipo": "voz", "frase": frase, "mp3": base64.b64encode(datos).decode("ascii")})
+
+    async def _transcribir(self, mesa, pcm):
+        if self.gestor_vosk is None or not self.gestor_vosk.disponible:
+            raise RuntimeError("Reconocimiento de voz no disponible en este servidor")
+        gramatica = mesa.asistente.gramatica_vosk(self.gestor_vosk.en_vocabulario)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._ejecutor, self._decodificar, pcm, gramatica
+        )
+
+    def _decodificar(self, pcm, gramatica):
+        from reconocimiento import limpiar_desconocidas
+        segmentos = []
+        paso = 8000  # 250 ms a 16 kHz en int16
+        with self.gestor_vosk.prestar(timeout=10, gramatica=gramatica) as rec:
+            for i in range(0, len(pcm), paso):
+                if rec.AcceptWaveform(pcm[i:i + paso]):
+                    segmentos.append(json.loads(rec.Result()).get("text", ""))
+            segmentos.append(json.loads(rec.FinalResult()).get("text", ""))
+        return limpiar_desconocidas(" ".join(s for s in segmentos if s)).strip()
+
+
+class ClienteMesas:
+    """Cliente mínimo del protocolo, para pruebas locales y como referencia para las mesas"""
+
+    def __init__(self):
+        self.lector = None
+        self.escritor = None
+
+    async def conectar(self, host="127.0.0.1", puerto=8765):
+        self.lector, self.escritor = await asyncio.open_connection(host, puerto)
+
+    async def cerrar(self):
+        if self.escritor:
+            self.escritor.close()
+            await self.escritor.wait_closed()
+
+    async def _enviar(self, mensaje):
+        self.escritor.write(json.dumps(mensaje, ensure_ascii=False).encode("utf-8") + b"\n")
+        await self.escritor.drain()
+
+    async def _recibir(self):
+        linea = await self.lector.readline()
+        if not linea:
+            raise ConnectionError("El servidor cerró la conexión")
+        mensaje = json.loads(linea)
+        if mensaje.get("tipo") == "error":
+            raise RuntimeError(mensaje["mensaje"])
+        return mensaje
+
+    async def crear_mesa(self):
+        await self._enviar({"tipo": "crear_mesa"})
+        return (await self._recibir())["mesa"]
+
+    async def decir(self, mesa, texto, voz=False, al_mensaje=None):
+        """Envía un turno de texto y devuelve el mensaje "fin"; al_mensaje(m) recibe los intermedios"""
+        await self._enviar({"tipo": "texto", "mesa": mesa, "texto": texto, "voz": voz})
+        return await self._hasta_fin(al_mensaje)
+
+    async def hablar(self, mesa, pcm, voz=False, al_mensaje=None):
+        """Envía audio PCM int16 mono a la frecuencia del modelo y devuelve el mensaje "fin" (o la transcripción)"""
+        await self._enviar({"tipo": "audio", "mesa": mesa, "pcm": base64.b64encode(pcm).decode("ascii"), "voz": voz})
+        transcripcion = await self._recibir()
+        if len(transcripcion.get("texto", "")) <= 2:
+            return transcripcion
+        return await self._hasta_fin(al_mensaje)
+
+    async def estado(self, mesa):
+        await self._enviar({"tipo": "estado", "mesa": mesa})
+        return (await self._recibir())["estado"]
+
+    async def cerrar_mesa(self, mesa):
+        await self._enviar({"tipo": "cerrar_mesa", "mesa": mesa})
+        await self._recibir()
+
+    async def _hasta_fin(self, al_mensaje):
+        while True:
+            mensaje = await self._recibir()
+            if mensaje["tipo"] == "fin":
+                return mensaje
+            if al_mensaje:
+                al_mensaje(mensaje)
+
+
+_GUION_DEMO = [
+    "comenzar", "me llamo Ana", "José", "Carlos", "listo", "ok", "ok", "ok",
+    "es algo frío", "se come", "lo venden en la playa", "votar",
+    "voto por Ana", "voto por José", "voto por Carlos",
+    "dijo que sí", "dijo que no", "dijo que tal vez"
+]
+
+
+async def _demo(servidor, mesas):
+    """Juega la misma partida guionada en varias mesas a la vez a través de clientes locales"""
+    host, puerto = await servidor.iniciar("127.0.0.1", 0)
+
+    async def jugar(n):
+        cliente = ClienteMesas()
+        await cliente.conectar(host, puerto)
+        mesa = await cliente.crear_mesa()
+        for texto in _GUION_DEMO:
+            fin = await cliente.decir(mesa, texto)
+        print(f"[DEMO] Mesa {mesa}: fase final {fin['estado']['fase']}")
+        await cliente.cerrar_mesa(mesa)
+        await cliente.cerrar()
+
+    await asyncio.gather(*(jugar(n) for n in range(mesas)))
+    await servidor.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor multi-mesa de El Impostor (JSON por líneas sobre TCP local)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--modelo", default="model", help="carpeta del modelo Vosk (compartido por todas las mesas)")
+    parser.add_argument("--sin-ia", action="store_true", help="LLM y TTS nulos: solo el motor local, sin red")
+    parser.add_argument("--demo", type=int, metavar="MESAS", help="juega una partida guionada en MESAS mesas y termina")
+    parser.add_argument("--log", help="nivel de registro (DEBUG, INFO, WARNING...); por defecto IMPOSTOR_LOG o INFO")
+    args = parser.parse_args()
+    configurar(args.log)
+
+    llm = tts = cache_respuestas = None
+    if args.sin_ia or args.demo:
+        from servicios import LLMNulo, TTSNulo
+        llm, tts = LLMNulo(), TTSNulo()
+        cache_respuestas = CacheRespuestas(None)  # respuestas fijas: no vale la pena guardarlas
+
+    gestor_vosk = None
+    if os.path.exists(args.modelo) and not args.demo:
+        from reconocimiento import GestorModeloVosk
+        from captura import frecuencia_modelo
+        gestor_vosk = GestorModeloVosk.compartido(args.modelo, frecuencia_modelo(args.modelo))
+        gestor_vosk.cargar_en_segundo_plano()
+
+    servidor = ServidorMesas(llm=llm, tts=tts, gestor_vosk=gestor_vosk, cache_respuestas=cache_respuestas)
+
+    if args.demo:
+        asyncio.run(_demo(servidor, args.demo))
+        return
+
+    async def correr():
+        host, puerto = await servidor.iniciar(args.host, args.puerto)
+        log.info("Escuchando en %s:%s", host, puerto)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(correr())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
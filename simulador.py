@@ -0,0 +1,134 @@
+import argparse
+import random
+import time
+
+from bitacora import configurar
+from demo_mdi_ia import AsistenteImpostor
+from cache_respuestas import CacheRespuestas
+from maquina_estados import Fase
+from servicios import LLMNulo
+
+NOMBRES = ["Ana", "José", "Carlos", "Valeria", "Lucía", "Diego", "Sofía", "Mateo", "Camila", "Andrés"]
+PISTAS = [
+    "es algo frío", "se come", "lo venden en la playa", "es redondo", "me recuerda a mi abuela",
+    "tiene colores", "es muy caro", "lo uso todos los días", "es famoso", "sale en la tele"
+]
+CONFIRMACIONES = ["listo", "ok", "ya", "ya la vi", "entendido", "siguiente"]
+RESPUESTAS_FINALES = ["dijo que sí", "dijo que no le gusta", "respondió que tal vez", "dijo que nunca lo haría"]
+
+
+def con_ruido(texto, rng, probabilidad):
+    """Imita un error de transcripción: cambia una letra de vez en cuando"""
+    if len(texto) < 4 or rng.random() >= probabilidad:
+        return texto
+    i = rng.randrange(1, len(texto) - 1)
+    return texto[:i] + rng.choice("aeioulnrs") + texto[i + 1:]
+
+
+class SimuladorPartidas:
+    """Juega partidas completas contra el motor, sin red, de forma reproducible.
+
+    Todo el azar (jugadores y motor) sale de `semilla`, así que la misma semilla
+    produce exactamente la misma partida. `al_turno(fase, texto, segundos)` recibe
+    cada turno para medirlo.
+    """
+
+    def __init__(self, semilla=0, n_jugadores=4, max_rondas=2, ruido=0.1, al_turno=None, max_turnos=200):
+        self.semilla = semilla
+        self.n_jugadores = n_jugadores
+        self.max_rondas = max_rondas
+        self.ruido = ruido
+        self.al_turno = al_turno
+        self.max_turnos = max_turnos
+
+    def crear_asistente(self):
+        """Motor sin red con su propio generador aleatorio; hay que liberarlo con cerrar()"""
+        asistente = AsistenteImpostor(
+            llm=LLMNulo(), cache_respuestas=CacheRespuestas(None), rng=random.Random(self.semilla)
+        )
+        asistente.presupuesto_comentario = 0.05
+        return asistente
+
+    def _entrada(self, asistente, rng, nombres, ronda):
+        fase = asistente.fase
+        if fase == Fase.INICIO:
+            return rng.choice(["comenzar", "hola, vamos a comenzar", "dale"])
+        if fase == Fase.REGISTRO:
+            if len(asistente.jugadores) < len(nombres):
+                return rng.choice(["", "me llamo ", "soy "]) + nombres[len(asistente.jugadores)]
+            return rng.choice(["listo", "ya estamos todos"])
+        if fase == Fase.MOSTRANDO_PALABRAS:
+            return rng.choice(CONFIRMACIONES)
+        if fase == Fase.JUGANDO:
+            return rng.choice(PISTAS)
+        if fase == Fase.DECISION_RONDA:
+            return "otra ronda" if ronda < self.max_rondas and rng.random() < 0.5 else "votar"
+        if fase == Fase.VOTACION:
+            return "voto por " + con_ruido(rng.choice(nombres).lower(), rng, self.ruido)
+        if fase == Fase.PREGUNTA_FINAL:
+            return rng.choice(RESPUESTAS_FINALES)
+        return None
+
+    def jugar(self, asistente=None):
+        """Juega una partida y devuelve un resumen con los turnos y las transiciones.
+
+        Si no se pasa `asistente` se crea uno y se cierra al terminar; uno ajeno lo cierra quien lo creó.
+        """
+        rng = random.Random(self.semilla)
+        propio = asistente is None
+        if propio:
+            asistente = self.crear_asistente()
+        try:
+            return self._jugar(asistente, rng)
+        finally:
+            if propio:
+                asistente.cerrar()
+
+    def _jugar(self, asistente, rng):
+        nombres = rng.sample(NOMBRES, self.n_jugadores)
+
+        turnos = 0
+        ronda = 1
+        inicio = time.perf_counter()
+        while turnos < self.max_turnos:
+            texto = self._entrada(asistente, rng, nombres, ronda)
+            if texto is None:
+                break
+            fase = asistente.fase
+            t0 = time.perf_counter()
+            respuesta = asistente.procesar_entrada(texto)
+            duracion = time.perf_counter() - t0
+            turnos += 1
+            if "[NUEVA_RONDA]" in respuesta:
+                ronda += 1
+            if self.al_turno:
+                self.al_turno(fase, texto, duracion)
+
+        return {
+            "semilla": self.semilla,
+            "turnos": turnos,
+            "segundos": time.perf_counter() - inicio,
+            "fase_final": str(asistente.fase),
+            "eventos": [e[1:] for e in asistente.maquina.historial()],
+            "votos": dict(asistente.votos_impostor),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Juega partidas simuladas contra el motor de El Impostor")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--partidas", type=int, default=1)
+    parser.add_argument("--jugadores", type=int, default=4)
+    parser.add_argument("--ruido", type=float, default=0.1, help="probabilidad de error de transcripción por voto")
+    parser.add_argument("--log", help="nivel de registro (DEBUG muestra cada turno); por defecto IMPOSTOR_LOG o INFO")
+    args = parser.parse_args()
+    configurar(args.log)
+
+    for i in range(args.partidas):
+        resultado = SimuladorPartidas(semilla=args.semilla + i, n_jugadores=args.jugadores, ruido=args.ruido).jugar()
+        print(f"Semilla {resultado['semilla']}: {resultado['turnos']} turnos en "
+              f"{resultado['segundos'] * 1000:.1f} ms, fase final {resultado['fase_final']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import logging
+
+import pytest
+
+import cache_respuestas
+from cache_respuestas import CacheRespuestas
+from demo_mdi_ia import AsistenteImpostor
+from servicios import LLMNulo
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def time(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = RelojFalso()
+    monkeypatch.setattr(cache_respuestas, "time", reloj)
+    return reloj
+
+
+def test_expira_por_ttl(reloj):
+    cache = CacheRespuestas(None, ttl=60)
+    cache.guardar("jugando", "¿Qué hago?", 4, "Da una pista.")
+
+    reloj.ahora += 59
+    assert cache.obtener("jugando", "que hago", 4) == "Da una pista."
+    reloj.ahora += 2
+    assert cache.obtener("jugando", "que hago", 4) is None
+    assert cache.estadisticas()["entradas"] == 0
+
+
+def test_expulsa_lo_menos_usado_al_llegar_a_256(reloj):
+    cache = CacheRespuestas(None)
+    assert cache.max_entradas == 256
+    for i in range(256):
+        cache.guardar("jugando", f"pregunta {i}", 4, f"respuesta {i}")
+    assert cache.obtener("jugando", "pregunta 0", 4) == "respuesta 0"  # ahora es la más reciente
+
+    cache.guardar("jugando", "pregunta nueva", 4, "respuesta nueva")
+    assert cache.estadisticas()["entradas"] == 256
+    assert cache.obtener("jugando", "pregunta 0", 4) == "respuesta 0"
+    assert cache.obtener("jugando", "pregunta 1", 4) is None
+    assert cache.obtener("jugando", "pregunta nueva", 4) == "respuesta nueva"
+
+
+def test_cerrar_anota_las_estadisticas(reloj, caplog):
+    cache = CacheRespuestas(None)
+    cache.guardar("jugando", "hola", 4, "Hola.")
+    cache.obtener("jugando", "hola", 4)
+    cache.obtener("jugando", "adios", 4)
+
+    with caplog.at_level(logging.INFO, logger="impostor.cache_respuestas"):
+        cache.cerrar()
+    assert "Aciertos 1, fallos 1 (50%), 1 entradas" in caplog.text
+
+
+@pytest.fixture
+def asistente():
+    asistente = AsistenteImpostor(llm=LLMNulo(), cache_respuestas=CacheRespuestas(None))
+    asistente.jugadores = ["Ana", "José"]
+    yield asistente
+    asistente.cerrar()
+
+
+@pytest.mark.parametrize("respuesta, cacheable", [
+    ("Da una pista que no sea demasiado obvia.", True),
+    ("[NUEVA_RONDA] Empezamos otra ronda.", False),
+    ("[VOTAR:Carlos] Voto registrado.", False),
+    ("Muy buena pista, ana.", False),
+    ("", False),
+])
+def test_solo_se_guardan_respuestas_sin_comandos_ni_jugadores(asistente, respuesta, cacheable):
+    assert asistente._es_respuesta_cacheable(respuesta) is cacheable
@@ -0,0 +1,56 @@
+import tracemalloc
+
+import numpy as np
+
+from captura import BufferCircular, RemuestreadorPolifase
+
+
+def test_buffer_circular_da_la_vuelta():
+    buffer = BufferCircular(8)
+    assert buffer.escribir(np.arange(6, dtype=np.int16)) == 6
+    buffer.consumir(5)
+    assert buffer.escribir(np.arange(10, 16, dtype=np.int16)) == 6  # 2 al final y 4 al principio
+
+    vistas = buffer.vistas()
+    assert len(vistas) == 2
+    assert np.concatenate(vistas).tolist() == [5, 10, 11, 12, 13, 14, 15]
+
+    # Lleno: lo que no cabe se descarta y se cuenta
+    assert buffer.escribir(np.arange(3, dtype=np.int16)) == 1
+    assert buffer.perdidas == 2
+    buffer.consumir(buffer.disponibles())
+    assert buffer.vistas() == ()
+
+
+def _remuestrear(remuestreador, senal, bloque):
+    return np.concatenate([remuestreador.procesar(senal[i:i + bloque]).copy()
+                           for i in range(0, len(senal), bloque)])
+
+
+def test_remuestreador_longitud_de_salida():
+    for entrada, salida in [(44100, 16000), (48000, 16000), (8000, 16000)]:
+        remuestreador = RemuestreadorPolifase(entrada, salida, bloque_max=entrada // 10)
+        senal = np.zeros(entrada * 3, dtype=np.int16)
+        resultado = _remuestrear(remuestreador, senal, entrada // 10)
+        assert len(resultado) == salida * 3
+
+
+def test_remuestreador_ganancia_continua():
+    remuestreador = RemuestreadorPolifase(44100, 16000, bloque_max=4410)
+    resultado = _remuestrear(remuestreador, np.full(44100, 10000, dtype=np.int16), 4410)
+    estable = resultado[100:]  # tras el transitorio del filtro
+    assert np.all(np.abs(estable.astype(np.int32) - 10000) <= 100)
+
+
+def test_remuestreador_sin_asignaciones_por_bloque():
+    remuestreador = RemuestreadorPolifase(44100, 16000, bloque_max=4410)
+    bloque = (np.random.default_rng(0).standard_normal(4410) * 3000).astype(np.int16)
+    remuestreador.procesar(bloque)
+    tracemalloc.start()
+    try:
+        for _ in range(5):
+            remuestreador.procesar(bloque)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert pico < 16 * 1024  # las matrices de trabajo (~1600 x 24) ya no se crean en cada bloque
@@ -0,0 +1,76 @@
+import dataclasses
+from types import MappingProxyType
+
+import pytest
+
+from cache_respuestas import CacheRespuestas
+from demo_mdi_ia import AsistenteImpostor
+from estado_ui import EstadoUI, PublicadorEstado
+from maquina_estados import Fase
+from servicios import LLMNulo
+
+
+@pytest.fixture
+def asistente():
+    asistente = AsistenteImpostor(llm=LLMNulo(), cache_respuestas=CacheRespuestas(None))
+    yield asistente
+    asistente.cerrar()
+
+
+def _registrar(asistente, *nombres):
+    asistente.procesar_entrada("comenzar")
+    for nombre in nombres:
+        asistente.procesar_entrada(nombre)
+
+
+def test_la_foto_es_inmutable_y_no_ve_cambios_del_motor(asistente):
+    _registrar(asistente, "me llamo Ana", "José")
+    estado = asistente.obtener_estado()
+
+    assert isinstance(estado.jugadores, tuple)
+    assert isinstance(estado.preguntas, tuple)
+    assert isinstance(estado.generos, MappingProxyType)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        estado.fase = Fase.RESULTADO
+    with pytest.raises(TypeError):
+        estado.generos["Ana"] = "m"
+
+    asistente.procesar_entrada("Carlos")
+    assert estado.jugadores == ("Ana", "José")
+    assert "Carlos" not in estado.generos
+    assert asistente.obtener_estado().jugadores == ("Ana", "José", "Carlos")
+
+
+def test_misma_version_devuelve_la_misma_foto(asistente):
+    assert asistente.obtener_estado() is asistente.obtener_estado()
+
+
+def test_diferencias_al_cambiar_de_fase(asistente):
+    antes = asistente.obtener_estado()
+    asistente.procesar_entrada("comenzar")
+    despues = asistente.obtener_estado()
+
+    assert despues.fase == Fase.REGISTRO
+    assert "fase" in despues.diferencias(antes)
+    assert "version" not in despues.diferencias(antes)
+    assert "jugadores" not in despues.diferencias(antes)
+    assert despues.diferencias(despues) == set()
+    assert despues.diferencias(None) == {f.name for f in dataclasses.fields(EstadoUI)} - {"version"}
+
+
+def test_suscriptores_filtrados_por_campo():
+    publicador = PublicadorEstado()
+    fases, jugadores, todos = [], [], []
+    publicador.suscribir(lambda estado, cambios: fases.append(estado.fase), campos={"fase"})
+    publicador.suscribir(lambda estado, cambios: jugadores.append(estado.jugadores), campos={"jugadores"})
+    cancelar = publicador.suscribir(lambda estado, cambios: todos.append(cambios))
+
+    publicador.publicar(EstadoUI(version=1, fase=Fase.REGISTRO))
+    publicador.publicar(EstadoUI(version=2, fase=Fase.REGISTRO, jugadores=("Ana",)))
+    publicador.publicar(EstadoUI(version=2, fase=Fase.REGISTRO, jugadores=("Ana",)))  # misma versión
+    cancelar()
+    publicador.publicar(EstadoUI(version=3, fase=Fase.MOSTRANDO_PALABRAS, jugadores=("Ana",)))
+
+    assert fases == [Fase.REGISTRO, Fase.MOSTRANDO_PALABRAS]
+    assert jugadores == [(), ("Ana",)]
+    assert len(todos) == 2 and todos[1] == {"jugadores"}
@@ -0,0 +1,60 @@
+import threading
+from types import SimpleNamespace
+
+from historial_chat import HistorialChat
+
+
+def _mensaje(rol, texto):
+    return SimpleNamespace(role=rol, parts=[SimpleNamespace(text=texto)])
+
+
+class SesionFalsa:
+    """Imita ChatSession: el intercambio entra al historial cuando la respuesta termina"""
+
+    def __init__(self, history):
+        self.history = list(history)
+
+    def send_message(self, prompt, stream=False):
+        fragmentos = [f"Respuesta a {prompt}", " y algo más."]
+        if not stream:
+            self.history += [_mensaje("user", prompt), _mensaje("model", "".join(fragmentos))]
+            return SimpleNamespace(text="".join(fragmentos))
+        return self._stream(prompt, fragmentos)
+
+    def _stream(self, prompt, fragmentos):
+        for fragmento in fragmentos:
+            yield SimpleNamespace(text=fragmento)
+        self.history += [_mensaje("user", prompt), _mensaje("model", "".join(fragmentos))]
+
+
+class ModeloFalso:
+    def start_chat(self, history):
+        return SesionFalsa(history)
+
+
+def test_historial_se_recorta_a_max_turnos_empezando_por_el_usuario():
+    historial = HistorialChat(ModeloFalso(), max_turnos=8)
+    for i in range(6):
+        historial.enviar(f"pregunta {i}")
+    for i in range(6, 11):
+        assert "".join(historial.enviar_stream(f"pregunta {i}")).startswith("Respuesta")
+
+    mensajes = historial.chat.history
+    assert len(mensajes) == 16
+    assert mensajes[0].role == "user"
+    assert mensajes[0].parts[0].text == "pregunta 3"
+    assert [m.role for m in mensajes] == ["user", "model"] * 8
+
+
+def test_stream_abandonado_no_bloquea_ni_se_guarda():
+    historial = HistorialChat(ModeloFalso())
+    abandonado = historial.enviar_stream("interrumpida")
+    assert next(abandonado) == "Respuesta a interrumpida"
+
+    hilo = threading.Thread(target=historial.enviar, args=("siguiente",))
+    hilo.start()
+    hilo.join(timeout=5)
+    assert not hilo.is_alive()
+
+    abandonado.close()
+    assert [m.parts[0].text for m in historial.chat.history] == ["siguiente", "Respuesta a siguiente y algo más."]
@@ -0,0 +1,93 @@
+import pytest
+
+import limitador
+from limitador import CuboTokens, segundos_de_reintento
+
+
+class RelojFalso:
+    """Sustituye al módulo time de limitador: sleep() solo adelanta el reloj"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+        self.esperas = []
+        self.avanza = True  # False: cada sleep() es otro hilo que llega en el mismo instante
+
+    def monotonic(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.esperas.append(segundos)
+        if self.avanza:
+            self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = RelojFalso()
+    monkeypatch.setattr(limitador, "time", reloj)
+    return reloj
+
+
+def test_rafaga_de_cuatro_sin_esperar(reloj):
+    cubo = CuboTokens(tasa=0.5, capacidad=4)
+    for _ in range(4):
+        assert cubo.adquirir()
+    assert reloj.esperas == []
+
+    assert cubo.adquirir()
+    assert reloj.esperas == [pytest.approx(2.0)]
+
+
+def test_recarga_de_medio_token_por_segundo(reloj):
+    cubo = CuboTokens(tasa=0.5, capacidad=4)
+    for _ in range(4):
+        cubo.adquirir()
+
+    reloj.ahora += 3.0  # 1.5 tokens
+    assert cubo.adquirir()
+    assert cubo.adquirir(timeout=1.0)  # medio token le falta: 1 s
+    assert reloj.esperas == [pytest.approx(1.0)]
+
+    reloj.ahora += 100.0  # no pasa de la capacidad
+    for _ in range(4):
+        cubo.adquirir()
+    assert len(reloj.esperas) == 1
+
+
+def test_timeout_rechazado_no_consume_token(reloj):
+    cubo = CuboTokens(tasa=0.5, capacidad=4)
+    for _ in range(4):
+        cubo.adquirir()
+
+    assert cubo.adquirir(timeout=1.0) is False
+    assert cubo.adquirir(timeout=1.0) is False
+    assert reloj.esperas == []
+
+    reloj.ahora += 2.0
+    assert cubo.adquirir(timeout=0.0)  # el token recargado sigue ahí
+    assert reloj.esperas == []
+
+
+def test_penalizar_frena_a_todos_el_tiempo_pedido(reloj):
+    cubo = CuboTokens(tasa=0.5, capacidad=4)
+    segundos = segundos_de_reintento("429 Quota exceeded. Please retry in 7.5s.")
+    assert segundos == 7.5
+
+    cubo.penalizar(segundos)
+    assert cubo.adquirir(timeout=5.0) is False
+
+    reloj.avanza = False
+    for _ in range(3):
+        assert cubo.adquirir()
+    # Todos esperan la penalización entera (sus tokens se recargan dentro de esa espera)
+    assert reloj.esperas == [pytest.approx(7.5), pytest.approx(7.5), pytest.approx(7.5)]
+
+    reloj.esperas.clear()
+    reloj.ahora += 7.5  # a la recarga del cubo le faltan los 3 tokens ya reservados
+    assert cubo.adquirir()
+    assert reloj.esperas == [pytest.approx(0.5)]
+
+
+def test_segundos_de_reintento():
+    assert segundos_de_reintento("retry_delay { seconds: 31 }") == 31.0
+    assert segundos_de_reintento("error desconocido", por_defecto=4.0) == 4.0
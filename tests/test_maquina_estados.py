@@ -0,0 +1,56 @@
+from maquina_estados import CUALQUIER_FASE, Fase, MaquinaEstados
+from simulador import SimuladorPartidas
+
+
+def test_guarda_rechaza_y_pasa_a_la_siguiente_transicion():
+    maquina = MaquinaEstados(Fase.VOTACION)
+    maquina.agregar(Fase.VOTACION, "voto", lambda s, t: "empate", Fase.PREGUNTA_FINAL,
+                    guarda=lambda s, t: s.get("empate"))
+    maquina.agregar(Fase.VOTACION, "voto", lambda s, t: "anotado")
+
+    assert maquina.despachar("voto", {"empate": False}) == "anotado"
+    assert maquina.fase == Fase.VOTACION
+    assert maquina.despachar("voto", {"empate": True}) == "empate"
+    assert maquina.fase == Fase.PREGUNTA_FINAL
+
+
+def test_guarda_rechazada_sin_alternativa_no_cambia_nada():
+    maquina = MaquinaEstados(Fase.REGISTRO)
+    maquina.agregar(Fase.REGISTRO, "listo", lambda s, t: "a jugar", Fase.MOSTRANDO_PALABRAS,
+                    guarda=lambda s, t: False)
+
+    assert maquina.despachar("listo") is None
+    assert maquina.fase == Fase.REGISTRO
+    assert maquina.historial() == []
+
+
+def test_fila_de_la_fase_exacta_gana_a_cualquier_fase():
+    maquina = MaquinaEstados(Fase.JUGANDO)
+    maquina.agregar(CUALQUIER_FASE, "reiniciar", lambda s, t: "general", Fase.INICIO)
+    maquina.agregar(Fase.JUGANDO, "reiniciar", lambda s, t: "propia")
+
+    assert maquina.despachar("reiniciar") == "propia"
+    assert maquina.fase == Fase.JUGANDO
+
+    maquina.fase = Fase.VOTACION
+    assert maquina.despachar("reiniciar") == "general"
+    assert maquina.fase == Fase.INICIO
+
+
+def test_registro_de_eventos_acotado():
+    maquina = MaquinaEstados(Fase.JUGANDO, max_eventos=5)
+    maquina.agregar(Fase.JUGANDO, "pista", lambda s, t: None)
+    for _ in range(12):
+        maquina.despachar("pista")
+
+    historial = maquina.historial()
+    assert len(historial) == 5
+    assert all(evento[1:] == ("jugando", "pista", "jugando") for evento in historial)
+
+
+def test_partida_simulada_llega_al_resultado():
+    resumen = SimuladorPartidas(semilla=7).jugar()
+
+    assert resumen["fase_final"] == Fase.RESULTADO
+    assert resumen["eventos"][-1][2] == Fase.RESULTADO.value
+    assert SimuladorPartidas(semilla=7).jugar()["eventos"] == resumen["eventos"]
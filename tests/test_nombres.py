@@ -0,0 +1,28 @@
+from nombres import IndiceNombres, clave_fonetica
+
+
+def test_claves_que_suenan_igual():
+    assert clave_fonetica("Karlos") == clave_fonetica("Carlos")
+    assert clave_fonetica("Baleria") == clave_fonetica("Valeria")
+    assert clave_fonetica("Ximena") == clave_fonetica("Jimena")
+    assert clave_fonetica("Jerardo") == clave_fonetica("Gerardo")
+
+
+def test_gu_ante_e_i_es_g_dura():
+    assert clave_fonetica("Miguel") == "migel"
+    assert clave_fonetica("Guido") == "gido"
+    assert clave_fonetica("Guillermo") == clave_fonetica("Guiyermo")
+    assert clave_fonetica("Guillermo") != clave_fonetica("Jillermo")
+    assert clave_fonetica("Guido") != clave_fonetica("Juido")
+
+
+def test_indice_resuelve_por_clave_fonetica():
+    indice = IndiceNombres()
+    for nombre in ["Carlos", "Valeria", "Miguel", "Guido", "Guillermo"]:
+        indice.agregar(nombre)
+
+    assert indice.resolver("karlos") == ("Carlos", 0.9)
+    assert indice.resolver("voto por baleria") == ("Valeria", 0.9)
+    assert indice.resolver("mighel") == ("Miguel", 0.9)
+    assert indice.resolver("guiyermo") == ("Guillermo", 0.9)
+    assert indice.resolver("guido") == ("Guido", 1.0)
@@ -0,0 +1,62 @@
+import pytest
+
+from pipeline_voz import PipelineVoz
+
+RESPUESTA = [
+    "Perfecto, Ana queda registrada. ",
+    "Ahora le toca a Carlos ver su palabra. ",
+    "Cuando termines di listo. ",
+    "Después empezamos con las pistas.",
+]
+
+
+def _hablar(reproducir):
+    recibidas = []
+    pipeline = PipelineVoz(sintetizar=lambda frase: frase, reproducir=reproducir)
+    dicho = pipeline.hablar(iter(RESPUESTA), lambda frase, hablada: recibidas.append((frase, hablada)))
+    return dicho, recibidas
+
+
+def test_interrupcion_muestra_todas_las_frases():
+    sonadas = []
+
+    def reproducir(audio):
+        sonadas.append(audio)
+        return len(sonadas) < 2  # el usuario interrumpe durante la segunda frase
+
+    dicho, recibidas = _hablar(reproducir)
+
+    assert [frase for frase, _ in recibidas] == [f.strip() for f in RESPUESTA]
+    assert [hablada for _, hablada in recibidas] == [True, True, False, False]
+    assert dicho == RESPUESTA[0].strip()
+
+
+def test_fallo_tts_muestra_todas_las_frases_y_propaga_el_error():
+    recibidas = []
+
+    def reproducir(audio):
+        raise ConnectionError("edge-tts sin red")
+
+    pipeline = PipelineVoz(sintetizar=lambda frase: frase, reproducir=reproducir)
+    with pytest.raises(ConnectionError):
+        pipeline.hablar(iter(RESPUESTA), lambda frase, hablada: recibidas.append((frase, hablada)))
+
+    assert [frase for frase, _ in recibidas] == [f.strip() for f in RESPUESTA]
+    assert [hablada for _, hablada in recibidas] == [True, False, False, False]
+
+
+def test_interrupcion_deja_de_sintetizar():
+    frases = [f"Frase {i} de la respuesta larga. " for i in range(10)]
+    sintetizadas = []
+
+    def sintetizar(frase):
+        sintetizadas.append(frase)
+        return frase
+
+    recibidas = []
+    pipeline = PipelineVoz(sintetizar=sintetizar, reproducir=lambda audio: False, adelanto=1)
+    pipeline.hablar(iter(frases), lambda frase, hablada: recibidas.append(frase))
+
+    assert len(recibidas) == len(frases)
+    # Solo las que ya estaban en la cola (o esperando entrar) cuando se interrumpió la primera
+    assert len(sintetizadas) <= 1 + pipeline.adelanto + 1
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from cache_respuestas import CacheRespuestas
+from cache_tts import CacheTTS
+from servicios import LLMNulo, TTSNulo
+from servidor import ClienteMesas, ServidorMesas
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    return ServidorMesas(llm=LLMNulo(), tts=TTSNulo(), cache_tts=CacheTTS(str(tmp_path)),
+                         cache_respuestas=CacheRespuestas(None))
+
+
+async def _con_servidor(servidor, prueba):
+    host, puerto = await servidor.iniciar("127.0.0.1", 0)
+    try:
+        await asyncio.wait_for(prueba(servidor, host, puerto), timeout=20)
+    finally:
+        await servidor.detener()
+
+
+async def _cliente(host, puerto):
+    cliente = ClienteMesas()
+    await cliente.conectar(host, puerto)
+    return cliente
+
+
+def test_dos_mesas_a_la_vez_no_se_mezclan(servidor):
+    async def prueba(servidor, host, puerto):
+        async def jugar(nombres):
+            cliente = await _cliente(host, puerto)
+            mesa = await cliente.crear_mesa()
+            await cliente.decir(mesa, "comenzar")
+            for nombre in nombres:
+                fin = await cliente.decir(mesa, nombre)
+            await cliente.cerrar()
+            return mesa, fin["estado"]
+
+        (mesa_a, estado_a), (mesa_b, estado_b) = await asyncio.gather(
+            jugar(["me llamo Ana", "José"]), jugar(["me llamo Carlos", "Pedro", "Lucía"])
+        )
+        assert mesa_a != mesa_b
+        assert estado_a["jugadores"] == ["Ana", "José"]
+        assert estado_b["jugadores"] == ["Carlos", "Pedro", "Lucía"]
+
+    asyncio.run(_con_servidor(servidor, prueba))
+
+
+def test_json_invalido_responde_error_y_la_conexion_sigue(servidor):
+    async def prueba(servidor, host, puerto):
+        cliente = await _cliente(host, puerto)
+        cliente.escritor.write(b"{esto no es json\n")
+        await cliente.escritor.drain()
+        with pytest.raises(RuntimeError):
+            await cliente._recibir()
+
+        mesa = await cliente.crear_mesa()
+        assert (await cliente.estado(mesa))["fase"]
+        await cliente.cerrar()
+
+    asyncio.run(_con_servidor(servidor, prueba))
+
+
+def test_cerrar_mesa_la_quita_del_servidor(servidor):
+    async def prueba(servidor, host, puerto):
+        cliente = await _cliente(host, puerto)
+        mesa = await cliente.crear_mesa()
+        assert mesa in servidor.mesas
+        await cliente.cerrar_mesa(mesa)
+        assert mesa not in servidor.mesas
+        with pytest.raises(RuntimeError):
+            await cliente.estado(mesa)
+        await cliente.cerrar()
+
+    asyncio.run(_con_servidor(servidor, prueba))
+
+
+def test_desconectarse_cierra_las_mesas_de_la_conexion(servidor):
+    async def prueba(servidor, host, puerto):
+        cliente = await _cliente(host, puerto)
+        await cliente.crear_mesa()
+        await cliente.crear_mesa()
+        assert len(servidor.mesas) == 2
+        await cliente.cerrar()
+        while servidor.mesas:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(_con_servidor(servidor, prueba))
@@ -0,0 +1,72 @@
+import numpy as np
+
+from vad import DetectorVoz
+
+FS = 16000
+
+
+def _tono(db, segundos, frecuencia=100.0):
+    """Seno con energía media `db` dBFS"""
+    t = np.arange(int(FS * segundos)) / FS
+    amplitud = np.sqrt(2) * 10 ** (db / 20) * 32768
+    return (amplitud * np.sin(2 * np.pi * frecuencia * t)).astype(np.int16)
+
+
+def _eventos(detector, senal):
+    n = detector.muestras_trama
+    return [detector.procesar(senal[i:i + n]) for i in range(0, len(senal) - n + 1, n)]
+
+
+def test_zumbido_constante_no_abre_locucion():
+    detector = DetectorVoz(FS)
+    eventos = _eventos(detector, _tono(-35, 10.0))
+    assert "inicio" not in eventos
+
+
+def test_voz_sobre_zumbido_abre_y_cierra_locucion():
+    detector = DetectorVoz(FS)
+    senal = np.concatenate((_tono(-35, 2.0), _tono(-10, 1.0, 220.0), _tono(-35, 2.0)))
+    eventos = [e for e in _eventos(detector, senal) if e]
+    assert eventos == ["inicio", "fin"]
+
+
+def test_reiniciar_conserva_el_ruido_aprendido():
+    detector = DetectorVoz(FS)
+    _eventos(detector, _tono(-35, 3.0))
+    ruido = detector.ruido_db
+    detector.reiniciar()
+    assert detector.ruido_db == ruido
+    assert "inicio" not in _eventos(detector, _tono(-35, 1.0))
+
+
+def _silabas(db, segundos, caida_db=10.0, ms_silaba=200):
+    """Voz sintética: tono a `db` dBFS que baja `caida_db` en la segunda mitad de cada sílaba"""
+    senal = _tono(db, segundos, 220.0).astype(np.float32)
+    muestras_silaba = FS * ms_silaba // 1000
+    for i in range(muestras_silaba // 2, len(senal), muestras_silaba):
+        senal[i:i + muestras_silaba // 2] *= 10 ** (-caida_db / 20)
+    return senal.astype(np.int16)
+
+
+def _indice_fin(detector, senal):
+    eventos = _eventos(detector, senal)
+    return eventos.index("inicio"), eventos.index("fin")
+
+
+def test_locucion_larga_no_se_corta_antes_de_terminar():
+    for voz in (_tono(-20, 10.0, 220.0), _silabas(-20, 10.0)):
+        detector = DetectorVoz(FS)
+        senal = np.concatenate((_tono(-55, 1.0), voz, _tono(-55, 2.0)))
+        inicio, fin = _indice_fin(detector, senal)
+
+        trama_fin_voz = (FS + len(voz)) // detector.muestras_trama
+        assert inicio <= FS // detector.muestras_trama + detector.tramas_inicio
+        # "fin" solo tras la pausa de cierre (ms_fin) que sigue a la voz
+        assert trama_fin_voz + detector.tramas_fin - 2 <= fin <= trama_fin_voz + detector.tramas_fin + 2
+
+
+def test_zumbido_que_empieza_despues_se_aprende_al_cortar_por_duracion():
+    detector = DetectorVoz(FS, max_ms_voz=3000)
+    senal = np.concatenate((_tono(-55, 1.0), _tono(-35, 10.0)))
+    eventos = [e for e in _eventos(detector, senal) if e]
+    assert eventos == ["inicio", "fin"]  # una sola locución, no una tras otra
@@ -0,0 +1,168 @@
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+
+from bitacora import registro
+
+# Uso:
+#   with trazador.span("transcripcion"): ...
+#   trazador.marca("tts_primer_byte")
+# Se activa con IMPOSTOR_TRAZAS=archivo.jsonl (una línea por evento) o archivo.json
+# (formato Chrome trace, se abre en chrome://tracing o Perfetto). Desactivado, span()
+# devuelve siempre el mismo objeto vacío y marca() vuelve en la primera línea. Los atributos
+# se guardan tal cual (p. ej. la Fase) y solo se convierten a texto al exportar; si calcularlos
+# cuesta algo, comprobar antes `trazador.activo`.
+
+log = registro("trazas")
+
+
+class _SpanNulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _SpanNulo()
+
+
+class _Span:
+    __slots__ = ("trazador", "nombre", "turno", "atributos", "inicio")
+
+    def __init__(self, trazador, nombre, turno, atributos):
+        self.trazador = trazador
+        self.nombre = nombre
+        self.turno = turno
+        self.atributos = atributos
+        self.inicio = 0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.trazador._guardar(self.nombre, self.turno, self.inicio, time.perf_counter_ns() - self.inicio, self.atributos)
+        return False
+
+
+class Trazador:
+    """Trazas por tramos de la latencia de cada turno: soltar botón → transcripción → motor → LLM → TTS → altavoz.
+
+    Cada turno abre con `nuevo_turno()`; los tramos (`span`) y marcas (`marca`) posteriores
+    se asocian a él aunque ocurran en otros hilos. Al salir del proceso escribe el archivo y
+    muestra un histograma de latencias de la sesión.
+    """
+
+    def __init__(self, ruta=None, activo=None):
+        self.ruta = ruta
+        self.activo = bool(ruta) if activo is None else activo
+        self.eventos = []  # (nombre, turno, inicio_ns, duracion_ns o None, hilo, atributos)
+        self._lock = threading.Lock()
+        self._turnos = itertools.count(1)
+        self.turno = 0
+        self._inicio_turno = {}
+        self._origen = time.perf_counter_ns()
+        if self.activo:
+            atexit.register(self.cerrar)
+
+    @classmethod
+    def desde_entorno(cls, variable="IMPOSTOR_TRAZAS"):
+        return cls(os.environ.get(variable) or None)
+
+    def nuevo_turno(self, nombre="soltar"):
+        """Empieza un turno nuevo (p. ej. al soltar el botón de grabar) y devuelve su número"""
+        if not self.activo:
+            return 0
+        self.turno = next(self._turnos)
+        ahora = time.perf_counter_ns()
+        self._inicio_turno[self.turno] = ahora
+        self._guardar(nombre, self.turno, ahora, None, None)
+        return self.turno
+
+    def span(self, nombre, **atributos):
+        if not self.activo:
+            return _NULO
+        return _Span(self, nombre, self.turno, atributos or None)
+
+    def marca(self, nombre, **atributos):
+        """Evento instantáneo (primer byte de TTS, empieza a sonar...)"""
+        if not self.activo:
+            return
+        self._guardar(nombre, self.turno, time.perf_counter_ns(), None, atributos or None)
+
+    def _guardar(self, nombre, turno, inicio, duracion, atributos):
+        evento = (nombre, turno, inicio, duracion, threading.get_ident(), atributos)
+        with self._lock:
+            self.eventos.append(evento)
+
+    # === Salida ===
+    def _latencias(self):
+        """nombre -> lista de ms: duración para tramos, tiempo desde el inicio del turno para marcas"""
+        latencias = {}
+        for nombre, turno, inicio, duracion, _, _ in self.eventos:
+            if duracion is not None:
+                valor = duracion / 1e6
+            elif turno in self._inicio_turno:
+                valor = (inicio - self._inicio_turno[turno]) / 1e6
+                if valor == 0:
+                    continue  # la propia marca de inicio de turno
+                nombre = f"{nombre} (desde inicio)"
+            else:
+                continue
+            latencias.setdefault(nombre, []).append(valor)
+        return latencias
+
+    def histograma(self):
+        lineas = [f"{'tramo':<36}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'máx ms':>10}"]
+        with self._lock:
+            latencias = self._latencias()
+        for nombre, valores in sorted(latencias.items()):
+            valores.sort()
+
+            def p(q):
+                return valores[min(len(valores) - 1, int(q * len(valores)))]
+            lineas.append(f"{nombre:<36}{len(valores):>6}{p(0.5):>10.1f}{p(0.9):>10.1f}{p(0.99):>10.1f}{valores[-1]:>10.1f}")
+        return "\n".join(lineas)
+
+    def exportar(self, ruta=None):
+        ruta = ruta or self.ruta
+        with self._lock:
+            eventos = list(self.eventos)
+        try:
+            with open(ruta, "w", encoding="utf-8") as f:
+                if ruta.endswith(".jsonl"):
+                    for nombre, turno, inicio, duracion, hilo, atributos in eventos:
+                        f.write(json.dumps({
+                            "nombre": nombre, "turno": turno,
+                            "inicio_ms": (inicio - self._origen) / 1e6,
+                            "duracion_ms": None if duracion is None else duracion / 1e6,
+                            "hilo": hilo, "atributos": atributos
+                        }, ensure_ascii=False) + "\n")
+                else:
+                    json.dump({"traceEvents": [
+                        {
+                            "name": nombre, "ph": "i" if duracion is None else "X", "s": "t",
+                            "ts": (inicio - self._origen) / 1e3,
+                            "dur": 0 if duracion is None else duracion / 1e3,
+                            "pid": 1, "tid": hilo, "args": dict(atributos or {}, turno=turno)
+                        }
+                        for nombre, turno, inicio, duracion, hilo, atributos in eventos
+                    ]}, f, ensure_ascii=False)
+        except OSError as e:
+            log.warning("No se pudo escribir %s: %s", ruta, e)
+
+    def cerrar(self):
+        if not self.activo or not self.eventos:
+            return
+        self.exportar()
+        print(f"\n[TRAZAS] {len(self.eventos)} eventos en {self.ruta}\n{self.histograma()}")
+
+
+# Trazador del proceso; inactivo salvo que se defina IMPOSTOR_TRAZAS
+trazador = Trazador.desde_entorno()
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class DetectorVoz:
+    """VAD por energía y cruces por cero con piso de ruido adaptativo.
+
+    Trabaja con tramas int16 de `muestras_trama` muestras y devuelve eventos
+    "inicio" / "fin" cuando detecta el comienzo o el final de una locución.
+    """
+
+    def __init__(self, frecuencia, ms_trama=30, margen_db=12.0, piso_db=-55.0,
+                 ms_inicio=90, ms_fin=700, max_ms_voz=30000, zcr_max=0.25,
+                 ms_calibracion=300, subida_ruido=0.01, bajada_ruido=0.2):
+        self.ms_trama = ms_trama
+        self.muestras_trama = int(frecuencia * ms_trama / 1000)
+        self.margen_db = margen_db      # cuánto debe superar la energía al ruido de fondo
+        self.piso_db = piso_db          # energía mínima absoluta (dBFS) para considerar voz
+        self.zcr_max = zcr_max          # tramas débiles con muchos cruces por cero son ruido/siseo
+        self.tramas_inicio = max(1, ms_inicio // ms_trama)
+        self.tramas_fin = max(1, ms_fin // ms_trama)
+        self.max_tramas_voz = max(1, max_ms_voz // ms_trama)
+        # Ruido de fondo: sube despacio y baja deprisa, así un ventilador o un zumbido
+        # constante acaban siendo fondo aunque estén por encima de piso_db + margen_db
+        self.subida_ruido = subida_ruido
+        self.bajada_ruido = bajada_ruido
+        self.tramas_calibracion = max(1, ms_calibracion // ms_trama)
+        self.ruido_db = piso_db
+        self.calibradas = 0  # las primeras tramas solo miden el fondo
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Empieza a buscar una locución nueva; el ruido de fondo aprendido se conserva"""
+        self.en_voz = False
+        self.tramas_voz = 0       # tramas seguidas con voz (antes del inicio)
+        self.tramas_silencio = 0  # tramas seguidas sin voz (durante la locución)
+        self.duracion = 0         # tramas desde el inicio de la locución
+        self.minimo_locucion = 0.0  # energía mínima (dB) dentro de la locución en curso
+
+    def _actualizar_ruido(self, energia_db):
+        if self.calibradas < self.tramas_calibracion:
+            # Media de las tramas de calibración
+            self.calibradas += 1
+            self.ruido_db += (energia_db - self.ruido_db) / self.calibradas
+        elif energia_db < self.ruido_db:
+            self.ruido_db += self.bajada_ruido * (energia_db - self.ruido_db)
+        else:
+            self.ruido_db += self.subida_ruido * (energia_db - self.ruido_db)
+
+    def es_voz(self, trama):
+        x = trama.astype(np.float32) / 32768.0
+        energia_db = 10.0 * np.log10(np.mean(x * x) + 1e-10)
+        if self.calibradas < self.tramas_calibracion:
+            self._actualizar_ruido(energia_db)
+            return False
+
+        voz = self._clasificar(trama, energia_db)
+        if self.en_voz:
+            self.minimo_locucion = min(self.minimo_locucion, energia_db)
+        # Dentro de una locución el fondo no aprende de la propia voz: subiría hasta cortarla
+        if not (self.en_voz and voz):
+            self._actualizar_ruido(energia_db)
+        return voz
+
+    def _clasificar(self, trama, energia_db):
+        umbral = max(self.ruido_db + self.margen_db, self.piso_db)
+        if energia_db < umbral:
+            return False
+
+        if energia_db < umbral + 6.0:
+            # Cerca del umbral: el siseo de fondo cruza el cero mucho más que la voz
+            zcr = np.count_nonzero(np.diff(np.signbit(trama))) / len(trama)
+            return zcr < self.zcr_max
+        return True
+
+    def procesar(self, trama):
+        """Clasifica una trama y devuelve "inicio", "fin" o None"""
+        voz = self.es_voz(trama)
+
+        if not self.en_voz:
+            self.tramas_voz = self.tramas_voz + 1 if voz else 0
+            if self.tramas_voz >= self.tramas_inicio:
+                self.en_voz = True
+                self.tramas_silencio = 0
+                self.duracion = self.tramas_voz
+                self.minimo_locucion = 0.0
+                return "inicio"
+            return None
+
+        self.duracion += 1
+        self.tramas_silencio = 0 if voz else self.tramas_silencio + 1
+        if self.tramas_silencio >= self.tramas_fin or self.duracion >= self.max_tramas_voz:
+            if self.tramas_silencio < self.tramas_fin:
+                # Cortada por duración: si era un ruido constante que empezó después de calibrar
+                # (un ventilador), su nivel mínimo pasa a ser el fondo; con voz real ese mínimo
+                # son las pausas y apenas cambia nada.
+                self.ruido_db = max(self.ruido_db, self.minimo_locucion)
+            self.en_voz = False
+            self.tramas_voz = 0
+            return "fin"
+        return None